@@ -0,0 +1,186 @@
+"""Export tutors, students and lessons to Parquet for offline analysis.
+
+Streams each collection from Motor in batches, converts them to Arrow
+record batches and writes Parquet under ANALYTICS_DIR:
+    tutors/part-<run>.parquet
+    students/part-<run>.parquet
+    lessons/month=YYYY-MM/part-<run>.parquet
+Runs are incremental: each exports documents whose created_at falls
+between the previous run's watermark (kept in _state.json) and its own
+start minus ANALYTICS_WATERMARK_LAG_SECONDS, which leaves time for inserts
+stamped earlier to become visible. Later edits to existing rows are not
+picked up; use --full to re-export everything. Files are written under
+_staging/<run> and moved into place once the state naming the run is
+saved, so a failed run leaves no rows behind and an interrupted move is
+finished by the next run.
+Any tool that reads hive-partitioned Parquet (pyarrow.dataset, DuckDB,
+pandas) can query the output directly.
+    python export_analytics.py [--full] [--batch-size 5000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import server
+
+logger = server.logger
+
+ANALYTICS_DIR = Path(os.environ.get("ANALYTICS_DIR", str(server.ROOT_DIR / "analytics")))
+STAGING_DIR = ANALYTICS_DIR / "_staging"
+# Must exceed the time between the API stamping created_at and the insert landing
+ANALYTICS_WATERMARK_LAG_SECONDS = int(os.environ.get("ANALYTICS_WATERMARK_LAG_SECONDS", "60"))
+
+TIMESTAMP = pa.timestamp("ms")
+SCHEMAS = {
+    "tutors": pa.schema([
+        ("id", pa.string()), ("email", pa.string()), ("name", pa.string()),
+        ("is_admin", pa.bool_()), ("created_at", TIMESTAMP),
+    ]),
+    "students": pa.schema([
+        ("id", pa.string()), ("tutor_id", pa.string()), ("name", pa.string()),
+        ("notes", pa.string()), ("lesson_link", pa.string()),
+        ("payment_status", pa.bool_()), ("homework_status", pa.bool_()), ("created_at", TIMESTAMP),
+    ]),
+    "lessons": pa.schema([
+        ("id", pa.string()), ("tutor_id", pa.string()), ("student_id", pa.string()),
+        ("title", pa.string()), ("subject", pa.string()), ("notes", pa.string()),
+        ("start_time", TIMESTAMP), ("end_time", TIMESTAMP), ("created_at", TIMESTAMP),
+    ]),
+}
+ID_COLUMNS = {"id", "tutor_id", "student_id"}
+
+
+def to_row(doc: dict, schema: pa.Schema) -> dict:
+    row = {"id": server.api_id(server.doc_id(doc))}
+    for field in schema.names:
+        if field == "id":
+            continue
+        value = doc.get(field)
+        row[field] = server.api_id(value) if field in ID_COLUMNS else value
+    return row
+
+
+class PartitionedWriter:
+    """Buffers rows per partition and flushes them as Arrow record batches."""
+
+    def __init__(self, root: Path, schema: pa.Schema, run_id: str, batch_size: int):
+        self.root, self.schema, self.run_id, self.batch_size = root, schema, run_id, batch_size
+        self.buffers = {}
+        self.writers = {}
+        self.rows = 0
+
+    def add(self, partition: str, row: dict):
+        buffer = self.buffers.setdefault(partition, [])
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush(partition)
+
+    def flush(self, partition: str):
+        rows = self.buffers.pop(partition, [])
+        if not rows:
+            return
+        if partition not in self.writers:
+            directory = self.root / partition if partition else self.root
+            directory.mkdir(parents=True, exist_ok=True)
+            self.writers[partition] = pq.ParquetWriter(
+                directory / f"part-{self.run_id}.parquet", self.schema, compression="zstd"
+            )
+        batch = pa.RecordBatch.from_pylist(rows, schema=self.schema)
+        self.writers[partition].write_batch(batch)
+        self.rows += len(rows)
+
+    def close(self):
+        for partition in list(self.buffers):
+            self.flush(partition)
+        for writer in self.writers.values():
+            writer.close()
+
+
+def load_state(full: bool) -> dict:
+    path = ANALYTICS_DIR / "_state.json"
+    if full or not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_state(state: dict):
+    path = ANALYTICS_DIR / "_state.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True))
+    tmp.replace(path)
+
+
+def publish(run_id: str):
+    """Move a staged run's files into place; safe to repeat after an interruption."""
+    staged = STAGING_DIR / run_id
+    for path in sorted(staged.rglob("*.parquet")):
+        target = ANALYTICS_DIR / path.relative_to(staged)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        path.replace(target)
+    shutil.rmtree(staged, ignore_errors=True)
+
+
+async def export_collection(name: str, cursor_factory, partition_of, state: dict, run_id: str, batch_size: int,
+                            until: datetime):
+    since = state.get(name)
+    # The first run also takes documents without created_at
+    match = {"created_at": {"$gt": datetime.fromisoformat(since), "$lte": until} if since else {"$not": {"$gt": until}}}
+    schema = SCHEMAS[name]
+    writer = PartitionedWriter(STAGING_DIR / run_id / name, schema, run_id, batch_size)
+    try:
+        async for doc in cursor_factory(match, batch_size):
+            writer.add(partition_of(doc), to_row(doc, schema))
+    finally:
+        writer.close()
+    state[name] = until.isoformat()
+    logger.info("analytics export", extra={"event": "analytics_export", "collection": name, "rows": writer.rows})
+    return writer.rows
+
+
+async def main(full: bool, batch_size: int):
+    if full and ANALYTICS_DIR.exists():
+        shutil.rmtree(ANALYTICS_DIR)
+    ANALYTICS_DIR.mkdir(parents=True, exist_ok=True)
+    state = load_state(full)
+    pending = state.pop("pending_run", None)
+    if pending:
+        publish(pending)
+        save_state(state)
+    # Whatever else is staged belongs to failed runs
+    shutil.rmtree(STAGING_DIR, ignore_errors=True)
+    started = datetime.utcnow()
+    run_id = started.strftime("%Y%m%dT%H%M%S")
+    until = started - timedelta(seconds=ANALYTICS_WATERMARK_LAG_SECONDS)
+
+    def plain(collection, projection=None):
+        return lambda match, size: collection.find(match, projection, batch_size=size)
+
+    await export_collection(
+        "tutors", plain(server.db.tutors, {"password": 0}), lambda doc: "", state, run_id, batch_size, until
+    )
+    await export_collection("students", plain(server.db.students), lambda doc: "", state, run_id, batch_size, until)
+    await export_collection(
+        "lessons", server.lesson_store.iterate,
+        lambda doc: f"month={server.as_datetime(doc['start_time']):%Y-%m}",
+        state, run_id, batch_size, until,
+    )
+    # The state naming the run is the commit point; publish() is then replayable
+    save_state({**state, "pending_run": run_id})
+    publish(run_id)
+    save_state(state)
+    server.client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--full", action="store_true", help="ignore the watermark and rewrite everything")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.full, args.batch_size))
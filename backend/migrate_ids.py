@@ -0,0 +1,100 @@
+"""Convert string UUID ids to BSON binary UUIDs for ID_STORAGE=binary.
+
+Each collection is rewritten into a scratch collection and swapped in with
+renameCollection, so a failed run leaves the original data in place. Stop
+the API first, run from the backend directory, then restart it with
+ID_STORAGE=binary:
+    python migrate_ids.py
+Index and data sizes are printed before and after.
+"""
+import asyncio
+import os
+import uuid
+
+os.environ["ID_STORAGE"] = "binary"
+
+import server  # noqa: E402
+
+BATCH = 5000
+
+
+def as_uuid(value):
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(value)
+
+
+def convert_entity(doc):
+    """Tutors, students and lessons: the UUID moves into _id."""
+    doc["_id"] = as_uuid(doc.pop("id")) if "id" in doc else doc["_id"]
+    for field in server.REFERENCE_FIELDS:
+        if field in doc:
+            doc[field] = as_uuid(doc[field])
+    return doc
+
+
+def convert_references(doc):
+    """Rollups: only the foreign keys change."""
+    for field in server.REFERENCE_FIELDS:
+        if field in doc:
+            doc[field] = as_uuid(doc[field])
+    return doc
+
+
+def convert_bucket(doc):
+    doc["tutor_id"] = as_uuid(doc["tutor_id"])
+    for lesson in doc.get("lessons", []):
+        lesson["id"] = as_uuid(lesson["id"])
+        lesson["student_id"] = as_uuid(lesson["student_id"])
+    return doc
+
+
+async def collection_size(name):
+    stats = await server.db.command("collStats", name)
+    return stats.get("size", 0), stats.get("totalIndexSize", 0)
+
+
+async def rewrite(name, convert):
+    source = server.db[name]
+    scratch = server.db[f"{name}_migrating"]
+    await scratch.drop()
+    batch = []
+    async for doc in source.find():
+        batch.append(convert(doc))
+        if len(batch) >= BATCH:
+            await scratch.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await scratch.insert_many(batch, ordered=False)
+    if await scratch.estimated_document_count():
+        await scratch.rename(name, dropTarget=True)
+
+
+async def main():
+    collections = {
+        "tutors": convert_entity,
+        "students": convert_entity,
+        "lessons": convert_entity,
+        "lesson_buckets": convert_bucket,
+        "lesson_rollups": convert_references,
+    }
+    existing = set(await server.db.list_collection_names())
+    before = {}
+    for name in collections:
+        if name in existing:
+            before[name] = await collection_size(name)
+
+    for name, convert in collections.items():
+        if name in existing:
+            print(f"Converting {name}...")
+            await rewrite(name, convert)
+    # Rebuild the indexes the app expects in binary mode
+    await server.create_indexes()
+
+    mb = 1024 * 1024
+    print(f"{'collection':<16}{'data MB before':>16}{'after':>10}{'index MB before':>17}{'after':>10}")
+    for name, (data_before, index_before) in before.items():
+        data_after, index_after = await collection_size(name)
+        print(f"{name:<16}{data_before / mb:>16.2f}{data_after / mb:>10.2f}{index_before / mb:>17.2f}{index_after / mb:>10.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,23 @@
+"""Copy lessons into per-tutor monthly buckets for LESSON_STORAGE=buckets.
+
+Run from the backend directory before switching the setting:
+    python migrate_lesson_storage.py
+Existing buckets for the same tutor and month are replaced, so the script
+can be re-run; db.lessons is left untouched.
+"""
+import asyncio
+
+import server
+
+
+async def main():
+    store = server.BucketLessonStore(server.db.lesson_buckets)
+    await store.create_indexes()
+    await store.import_from(server.db.lessons)
+    lessons = await server.db.lessons.count_documents({})
+    buckets = await store.collection.count_documents({})
+    print(f"Copied {lessons} lessons into {buckets} buckets")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,284 @@
+"""Lesson reminder scheduler.
+
+Keeps reminders for lessons starting within the next REMINDER_HORIZON_HOURS
+in an in-memory heap, loaded through the start_time index and kept current
+by tailing lesson_events. Only the horizon is held in memory, so the number
+of future lessons overall does not matter. Each reminder fires
+REMINDER_LEAD_MINUTES before the lesson through a pluggable sender:
+    python scheduler.py [--sender stdout|smtp]
+SMTP settings come from SMTP_HOST/SMTP_PORT/SMTP_FROM; for local testing
+point them at a stand-in such as `python -m aiosmtpd -n -l localhost:8025`.
+"""
+import argparse
+import asyncio
+import heapq
+import os
+import smtplib
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from pymongo import CursorType
+from pymongo.errors import DuplicateKeyError
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
+
+import server
+
+logger = server.logger
+
+REMINDER_LEAD_MINUTES = int(os.environ.get("REMINDER_LEAD_MINUTES", "30"))
+REMINDER_HORIZON_HOURS = int(os.environ.get("REMINDER_HORIZON_HOURS", "24"))
+# How far back a restarted event cursor re-scans; covers clock skew between
+# the processes publishing lesson events
+EVENT_OVERLAP_SECONDS = int(os.environ.get("EVENT_OVERLAP_SECONDS", "30"))
+# Sends are retried with backoff before the reminder is given up until restart
+REMINDER_SEND_ATTEMPTS = int(os.environ.get("REMINDER_SEND_ATTEMPTS", "3"))
+SMTP_HOST = os.environ.get("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "8025"))
+SMTP_FROM = os.environ.get("SMTP_FROM", "reminders@tutor.local")
+
+
+class ReminderQueue:
+    """Min-heap of (fire_at, lesson_id) with lazy cancellation.
+
+    `entries` maps a lesson id to its live (fire_at, tutor_id, student_id);
+    heap items that no longer match are skipped when popped.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def schedule(self, lesson_id, fire_at: datetime, tutor_id=None, student_id=None):
+        self.entries[lesson_id] = (fire_at, tutor_id, student_id)
+        heapq.heappush(self.heap, (fire_at, str(lesson_id), lesson_id))
+        # Rebuild when cancelled items dominate so the heap stays bounded
+        if len(self.heap) > 2 * len(self.entries) + 1024:
+            self.heap = [(entry[0], str(key), key) for key, entry in self.entries.items()]
+            heapq.heapify(self.heap)
+
+    def cancel(self, lesson_id):
+        self.entries.pop(lesson_id, None)
+
+    def purge(self, tutor_id, student_id=None):
+        for lesson_id, (_, entry_tutor, entry_student) in list(self.entries.items()):
+            if entry_tutor == tutor_id and (student_id is None or entry_student == student_id):
+                del self.entries[lesson_id]
+
+    def next_fire_at(self):
+        while self.heap:
+            fire_at, _, lesson_id = self.heap[0]
+            entry = self.entries.get(lesson_id)
+            if entry is not None and entry[0] == fire_at:
+                return fire_at
+            heapq.heappop(self.heap)
+        return None
+
+    def pop_due(self, now: datetime):
+        due = []
+        while (fire_at := self.next_fire_at()) is not None and fire_at <= now:
+            _, _, lesson_id = heapq.heappop(self.heap)
+            due.append((lesson_id, fire_at, self.entries.pop(lesson_id)[1]))
+        return due
+
+
+class SeenEvents:
+    """Recently applied lesson events, so a re-scanned overlap applies each once.
+
+    Event ids come from several processes and are not ordered, so resuming
+    uses the `at` timestamp minus an overlap instead of `_id > last`.
+    """
+
+    def __init__(self, since: datetime, overlap: timedelta):
+        self.overlap = overlap
+        self.latest = since
+        self.ids = {}
+
+    def add(self, event: dict) -> bool:
+        """Record event; False if it was already applied."""
+        if event["_id"] in self.ids:
+            return False
+        self.ids[event["_id"]] = event["at"]
+        self.latest = max(self.latest, event["at"])
+        return True
+
+    def resume_at(self) -> datetime:
+        return self.latest - self.overlap
+
+    def prune(self):
+        cutoff = self.resume_at()
+        self.ids = {event_id: at for event_id, at in self.ids.items() if at >= cutoff}
+
+
+class StdoutSender:
+    async def send(self, to: str, subject: str, body: str):
+        print(f"REMINDER to={to} subject={subject!r}\n{body}", flush=True)
+
+
+class SmtpSender:
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, sender: str = SMTP_FROM):
+        self.host, self.port, self.sender = host, port, sender
+
+    def _send(self, message: EmailMessage):
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            smtp.send_message(message)
+
+    async def send(self, to: str, subject: str, body: str):
+        message = EmailMessage()
+        message["From"], message["To"], message["Subject"] = self.sender, to, subject
+        message.set_content(body)
+        await asyncio.to_thread(self._send, message)
+
+
+SENDERS = {"stdout": StdoutSender, "smtp": SmtpSender}
+
+
+class ReminderScheduler:
+    def __init__(self, sender):
+        self.sender = sender
+        self.queue = ReminderQueue()
+        self.wakeup = asyncio.Event()
+        self.horizon = None
+        self.lead = timedelta(minutes=REMINDER_LEAD_MINUTES)
+        self.firing = set()
+
+    def track(self, lesson_id, start_time, tutor_id, student_id):
+        fire_at = start_time - self.lead
+        if start_time > datetime.utcnow() and fire_at < self.horizon:
+            self.queue.schedule(lesson_id, fire_at, tutor_id, student_id)
+            self.wakeup.set()
+        else:
+            self.queue.cancel(lesson_id)
+
+    async def extend_horizon(self):
+        """Load lessons whose reminders fall inside the next horizon window."""
+        now = datetime.utcnow()
+        # The first load also takes lessons starting within the lead time, whose
+        # reminders are overdue after a restart; track() fires them right away
+        start = {"$gt": now} if self.horizon is None else {"$gte": max(self.horizon, now) + self.lead}
+        self.horizon = now + timedelta(hours=REMINDER_HORIZON_HOURS)
+        lessons = await server.lesson_store.find(
+            {"start_time": {**start, "$lt": self.horizon + self.lead}},
+            {"_id": 1, "id": 1, "tutor_id": 1, "student_id": 1, "start_time": 1},
+        )
+        for lesson in lessons:
+            self.track(server.doc_id(lesson), lesson["start_time"], lesson["tutor_id"], lesson.get("student_id"))
+        logger.info("reminder horizon extended", extra={
+            "event": "reminder_horizon", "loaded": len(lessons), "scheduled": len(self.queue),
+        })
+
+    async def tail_events(self, since: datetime):
+        """Apply lesson events published at or after `since`, across cursor restarts."""
+        seen = SeenEvents(since, timedelta(seconds=EVENT_OVERLAP_SECONDS))
+        while True:
+            cursor = server.db.lesson_events.find(
+                {"at": {"$gte": seen.resume_at()}}, cursor_type=CursorType.TAILABLE_AWAIT
+            )
+            while cursor.alive:
+                async for event in cursor:
+                    if seen.add(event):
+                        self.apply(event)
+                seen.prune()
+                await asyncio.sleep(0.1)
+            await asyncio.sleep(1)
+
+    def apply(self, event: dict):
+        if event["op"] == "upsert":
+            self.track(event["id"], event["start_time"], event["tutor_id"], event.get("student_id"))
+        elif event["op"] == "delete":
+            self.queue.cancel(event["id"])
+        elif event["op"] == "purge":
+            self.queue.purge(event["tutor_id"], event.get("student_id"))
+
+    async def fire(self, lesson_id, fire_at: datetime, tutor_id):
+        # One row per reminder makes firing idempotent across restarts and
+        # replicas. It claims the reminder and is released if sending fails,
+        # so the next scheduler start sends it instead of skipping it.
+        reminder_id = f"{lesson_id}:{fire_at.isoformat()}"
+        try:
+            await server.db.reminders_sent.insert_one({"_id": reminder_id, "at": datetime.utcnow()})
+        except DuplicateKeyError:
+            return
+        try:
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(REMINDER_SEND_ATTEMPTS),
+                wait=wait_exponential(multiplier=1, max=30),
+                reraise=True,
+            ):
+                with attempt:
+                    await self.deliver(lesson_id, fire_at, tutor_id)
+        except Exception:
+            await server.db.reminders_sent.delete_one({"_id": reminder_id})
+            raise
+
+    async def deliver(self, lesson_id, fire_at: datetime, tutor_id):
+        lesson = await server.lesson_store.find_one(tutor_id, lesson_id)
+        if lesson is None:
+            return
+        tutor = await server.db.tutors.find_one({server.ID_KEY: lesson["tutor_id"]}, {"email": 1, "name": 1})
+        student = await server.db.students.find_one(
+            {server.ID_KEY: lesson["student_id"], "tutor_id": lesson["tutor_id"]}, {"name": 1}
+        )
+        if tutor is None:
+            return
+        student_name = student["name"] if student else "your student"
+        await self.sender.send(
+            tutor["email"],
+            f"Upcoming lesson: {lesson['title']}",
+            f"{lesson['title']} ({lesson['subject']}) with {student_name} starts at "
+            f"{lesson['start_time']:%Y-%m-%d %H:%M} UTC.",
+        )
+        lateness_ms = (datetime.utcnow() - fire_at).total_seconds() * 1000
+        logger.info("reminder sent", extra={
+            "event": "reminder_sent", "lesson_id": server.api_id(lesson_id), "lateness_ms": round(lateness_ms, 1),
+        })
+
+    def start_firing(self, lesson_id, fire_at: datetime, tutor_id):
+        task = asyncio.create_task(self.fire(lesson_id, fire_at, tutor_id))
+        # The loop only keeps weak references to tasks
+        self.firing.add(task)
+
+        def done(task):
+            self.firing.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                logger.error("reminder failed", exc_info=task.exception(), extra={
+                    "event": "reminder_failed", "lesson_id": server.api_id(lesson_id),
+                })
+
+        task.add_done_callback(done)
+
+    async def run(self):
+        await server.ensure_lesson_events()
+        await server.db.reminders_sent.create_index("at", expireAfterSeconds=7 * 24 * 3600)
+        # Taken before the initial load, so events published during it are replayed
+        since = datetime.utcnow()
+        await self.extend_horizon()
+        tail = asyncio.create_task(self.tail_events(since))
+        refresh_every = timedelta(hours=REMINDER_HORIZON_HOURS) / 2
+        next_refresh = datetime.utcnow() + refresh_every
+        try:
+            while True:
+                now = datetime.utcnow()
+                for lesson_id, fire_at, tutor_id in self.queue.pop_due(now):
+                    self.start_firing(lesson_id, fire_at, tutor_id)
+                if now >= next_refresh:
+                    await self.extend_horizon()
+                    next_refresh = now + refresh_every
+                next_fire = self.queue.next_fire_at()
+                deadline = min(next_fire, next_refresh) if next_fire else next_refresh
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=max(0.0, (deadline - datetime.utcnow()).total_seconds()))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            tail.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sender", choices=sorted(SENDERS), default=os.environ.get("REMINDER_SENDER", "stdout"))
+    args = parser.parse_args()
+    asyncio.run(ReminderScheduler(SENDERS[args.sender]()).run())
@@ -1,28 +1,245 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.concurrency import run_in_threadpool
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
 import os
+import asyncio
+import base64
 import logging
+import math
+import time
+import re
 import uuid
+import hashlib
+import hmac
+import random
+import threading
+import contextvars
+import cProfile
+import itertools
+import marshal
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
-from datetime import datetime, timedelta
+from pydantic import AliasChoices, BaseModel, BeforeValidator, Field, EmailStr
+from typing import Annotated, List, Literal, Optional
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, time as dt_time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from passlib.context import CryptContext
 import jwt
-from bson import json_util
+from bson import Timestamp, decode as decode_bson, encode as encode_bson, json_util
+from pymongo import ReadPreference, ReturnDocument, UpdateMany, monitoring
+from pythonjsonlogger import jsonlogger
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import CollectionInvalid, DuplicateKeyError, OperationFailure
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential
+import csv
+import io
 import json
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Configure logging
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+if LOG_FORMAT == "json":
+    log_handler = logging.StreamHandler()
+    log_handler.setFormatter(jsonlogger.JsonFormatter(
+        '%(asctime)s %(name)s %(levelname)s %(message)s',
+        rename_fields={"asctime": "timestamp", "levelname": "level"},
+    ))
+    logging.basicConfig(level=logging.INFO, handlers=[log_handler])
+else:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+logger = logging.getLogger(__name__)
+
+# Request logging: fast requests are sampled, slow and failed ones always logged
+REQUEST_LOG_SAMPLE_RATE = float(os.environ.get("REQUEST_LOG_SAMPLE_RATE", "0.1"))
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "500"))
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "100"))
+
+class RequestLog:
+    """Per-request fields, mutated in place so Motor's executor threads can add DB time."""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.tutor_id = None
+        self.db_ms = 0.0
+        self.db_commands = 0
+        # Latest times from the client's session token and this request's writes
+        self.cluster_time = None
+        self.operation_time = None
+
+    def observe(self, cluster_time: Optional[dict], operation_time: Optional[Timestamp]):
+        if cluster_time and (self.cluster_time is None or cluster_time["clusterTime"] > self.cluster_time["clusterTime"]):
+            self.cluster_time = cluster_time
+        if operation_time and (self.operation_time is None or operation_time > self.operation_time):
+            self.operation_time = operation_time
+
+request_log = contextvars.ContextVar("request_log", default=None)
+
+def filter_shape(value):
+    """Replace literals with their type name so query shapes group in logs."""
+    if isinstance(value, dict):
+        return {key: filter_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [filter_shape(item) for item in value]
+    return type(value).__name__
+
+def command_filter(command_name: str, command: dict):
+    if command_name == "find":
+        return command.get("filter", {})
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline", [])
+        return pipeline[0].get("$match", {}) if pipeline else {}
+    if command_name in ("count", "distinct", "findAndModify"):
+        return command.get("query", {})
+    if command_name == "update":
+        return [update.get("q", {}) for update in command.get("updates", [])]
+    if command_name == "delete":
+        return [delete.get("q", {}) for delete in command.get("deletes", [])]
+    return None
+
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct"}
+WRITE_COMMANDS = {"insert", "update", "delete", "findAndModify"}
+COMMAND_ENVELOPE_FIELDS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "readConcern", "cursor"}
+
+class SlowQueryListener(monitoring.CommandListener):
+    """Adds command time to the current request and logs commands over SLOW_QUERY_MS.
+
+    Slow reads are explained once per (collection, shape) with the
+    queryPlanner verbosity, which does not execute the query, to report
+    whether the winning plan was a collection scan.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.explained = OrderedDict()
+        self.loop = None
+        self.lock = threading.Lock()
+
+    def started(self, event):
+        command_filter_value = command_filter(event.command_name, event.command)
+        if command_filter_value is None:
+            return
+        with self.lock:
+            self.pending[event.request_id] = (event.database_name, event.command_name, dict(event.command))
+
+    def succeeded(self, event):
+        current = request_log.get()
+        # Only writes move the session token forward; the time of a primary
+        # read would make the client's next secondary read wait out the
+        # whole replication lag
+        if current is not None and event.command_name in WRITE_COMMANDS:
+            current.observe(event.reply.get("$clusterTime"), event.reply.get("operationTime"))
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        duration_ms = event.duration_micros / 1000
+        current = request_log.get()
+        if current is not None:
+            current.db_ms += duration_ms
+            current.db_commands += 1
+        with self.lock:
+            pending = self.pending.pop(event.request_id, None)
+        if pending is None or duration_ms < SLOW_QUERY_MS:
+            return
+        database_name, command_name, command = pending
+        collection = command.get(command_name)
+        shape = filter_shape(command_filter(command_name, command))
+        extra = {
+            "event": "slow_query",
+            "command": command_name,
+            "collection": collection,
+            "filter_shape": shape,
+            "duration_ms": round(duration_ms, 2),
+            "request_id": current.request_id if current else None,
+        }
+        shape_key = (collection, command_name, json.dumps(shape, sort_keys=True))
+        if command_name in EXPLAINABLE_COMMANDS and self.loop and shape_key not in self.explained:
+            self.explained[shape_key] = True
+            if len(self.explained) > 1000:
+                self.explained.popitem(last=False)
+            explain_command = {k: v for k, v in command.items() if k not in COMMAND_ENVELOPE_FIELDS}
+            self.loop.call_soon_threadsafe(
+                asyncio.ensure_future, log_slow_query_plan(database_name, explain_command, extra)
+            )
+        else:
+            logger.warning("slow query", extra=extra)
+
+def plan_stages(plan: dict):
+    while plan:
+        yield plan.get("stage")
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+
+async def log_slow_query_plan(database_name: str, command: dict, extra: dict):
+    try:
+        explained = await client[database_name].command(
+            {"explain": command, "verbosity": "queryPlanner"}
+        )
+        planner = explained.get("queryPlanner") or explained.get("stages", [{}])[0].get("$cursor", {}).get("queryPlanner", {})
+        stages = [stage for stage in plan_stages(planner.get("winningPlan", {})) if stage]
+        extra["plan"] = stages
+        extra["collection_scan"] = "COLLSCAN" in stages
+    except Exception as exc:
+        extra["explain_error"] = str(exc)
+    logger.warning("slow query", extra=extra)
+
+slow_query_listener = SlowQueryListener()
+
+# Causal consistency. Responses carry, in X-Session-Token, the later of the
+# client's token and the time of any write the request made; clients echo it
+# back so reads served by a secondary wait until it has their writes.
+SESSION_TOKEN_HEADER = "X-Session-Token"
+READ_PREFERENCES = {
+    preference.mongos_mode: preference
+    for preference in (ReadPreference.PRIMARY, ReadPreference.PRIMARY_PREFERRED, ReadPreference.SECONDARY,
+                       ReadPreference.SECONDARY_PREFERRED, ReadPreference.NEAREST)
+}
+# Read preference for tutors' own list and detail reads; anything other
+# than "primary" runs them in causally consistent sessions
+READ_PREFERENCE = READ_PREFERENCES[os.environ.get("READ_PREFERENCE", "primary")]
+
+def encode_session_token(cluster_time: Optional[dict], operation_time: Timestamp) -> str:
+    return base64.urlsafe_b64encode(encode_bson({"cluster_time": cluster_time, "operation_time": operation_time})).decode()
+
+def decode_session_token(token: Optional[str]):
+    """Return (cluster_time, operation_time) from a client token; (None, None) if absent or invalid."""
+    if not token:
+        return None, None
+    try:
+        fields = decode_bson(base64.urlsafe_b64decode(token))
+    except Exception:
+        return None, None
+    cluster_time, operation_time = fields.get("cluster_time"), fields.get("operation_time")
+    if not isinstance(operation_time, Timestamp):
+        return None, None
+    if not (isinstance(cluster_time, dict) and isinstance(cluster_time.get("clusterTime"), Timestamp)):
+        cluster_time = None
+    return cluster_time, operation_time
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[slow_query_listener], uuidRepresentation="standard")
 db = client[os.environ.get('DB_NAME', 'tutor_app')]
 
+def for_reads(collection, session):
+    """collection, allowed to read from secondaries when given a causal session."""
+    if session is None:
+        return collection
+    return collection.with_options(read_preference=READ_PREFERENCE)
+
 # Create the main app without a prefix
 app = FastAPI()
 
@@ -31,12 +248,181 @@ api_router = APIRouter(prefix="/api")
 
 # Authentication
 SECRET_KEY = os.environ.get("SECRET_KEY", "supersecretkey123")
-ALGORITHM = "HS256"
+# HS256 signs with SECRET_KEY. EdDSA or ES256 sign with the PEM private key
+# in JWT_PRIVATE_KEY_FILE and verify with JWT_PUBLIC_KEY_FILE (derived from
+# the private key if unset), so verifying-only workers need no secret.
+ALGORITHM = os.environ.get("JWT_ALGORITHM", "HS256")
+JWT_PRIVATE_KEY_FILE = os.environ.get("JWT_PRIVATE_KEY_FILE")
+JWT_PUBLIC_KEY_FILE = os.environ.get("JWT_PUBLIC_KEY_FILE")
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 1 day
+# Verified claims are cached by token hash until the token's exp
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "10000"))
+
+def load_jwt_keys(algorithm: str):
+    """Return (signing key, verification key), parsed once at startup."""
+    if algorithm == "HS256":
+        return SECRET_KEY, SECRET_KEY
+    if algorithm not in ("EdDSA", "ES256"):
+        raise RuntimeError(f"Unsupported JWT_ALGORITHM: {algorithm}")
+    from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
+    private_key = public_key = None
+    if JWT_PRIVATE_KEY_FILE:
+        private_key = load_pem_private_key(Path(JWT_PRIVATE_KEY_FILE).read_bytes(), password=None)
+        public_key = private_key.public_key()
+    if JWT_PUBLIC_KEY_FILE:
+        public_key = load_pem_public_key(Path(JWT_PUBLIC_KEY_FILE).read_bytes())
+    if public_key is None:
+        raise RuntimeError(f"JWT_ALGORITHM={algorithm} needs JWT_PRIVATE_KEY_FILE or JWT_PUBLIC_KEY_FILE")
+    return private_key, public_key
+
+SIGNING_KEY, VERIFICATION_KEY = load_jwt_keys(ALGORITHM)
+
+class TokenCache:
+    """Verified JWT claims keyed by token hash, LRU-bounded, dropped at exp."""
+
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+        self.claims = OrderedDict()
+
+    def get(self, key: bytes) -> Optional[dict]:
+        payload = self.claims.get(key)
+        if payload is None:
+            return None
+        if payload["exp"] <= time.time():
+            del self.claims[key]
+            return None
+        self.claims.move_to_end(key)
+        return payload
+
+    def put(self, key: bytes, payload: dict):
+        self.claims[key] = payload
+        if len(self.claims) > self.max_tokens:
+            self.claims.popitem(last=False)
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
+
+# Conditional GET: clients must revalidate, but a matching ETag costs no body
+READ_CACHE_CONTROL = os.environ.get("READ_CACHE_CONTROL", "private, no-cache")
+
+# Request profiling. Admins opt in per request with "X-Profile: 1" or
+# ?profile=1; PROFILE_SAMPLE_EVERY=N also profiles 1 in N requests. Traces
+# go to PROFILE_DIR (newest PROFILE_KEEP kept): speedscope JSON when
+# pyinstrument is installed, otherwise cProfile stats.
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", str(ROOT_DIR / "profiles")))
+PROFILE_SAMPLE_EVERY = int(os.environ.get("PROFILE_SAMPLE_EVERY", "0"))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "200"))
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", "0.001"))
+
+# Response compression for direct uvicorn access. nginx strips Accept-Encoding
+# from /api requests and compresses itself, keeping it off the event loop.
+GZIP_MINIMUM_SIZE = int(os.environ.get("GZIP_MINIMUM_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "6"))
+
+# Rate limits as "<requests per second>/<burst>", enforced across the whole
+# deployment. Without REDIS_URL each uvicorn worker keeps its own buckets, so
+# every worker gets a 1/UVICORN_WORKERS share of the rate and burst.
+LOGIN_IP_RATE = os.environ.get("LOGIN_IP_RATE", "0.5/20")
+# Failed logins per (account, client IP), so others cannot lock a tutor out
+LOGIN_ACCOUNT_RATE = os.environ.get("LOGIN_ACCOUNT_RATE", "0.1/5")
+REGISTER_IP_RATE = os.environ.get("REGISTER_IP_RATE", "0.05/5")
+WRITE_TUTOR_RATE = os.environ.get("WRITE_TUTOR_RATE", "10/50")
+REDIS_URL = os.environ.get("REDIS_URL")
+UVICORN_WORKERS = int(os.environ.get("UVICORN_WORKERS", "1"))
+TRUSTED_PROXIES = set(os.environ.get("TRUSTED_PROXIES", "127.0.0.1").split(","))
+# bcrypt runs in the threadpool; beyond this many waiters we shed load
+BCRYPT_CONCURRENCY = int(os.environ.get("BCRYPT_CONCURRENCY", str(os.cpu_count() or 2)))
+BCRYPT_MAX_WAITING = int(os.environ.get("BCRYPT_MAX_WAITING", "32"))
+
+# Default working hours for availability, in the tutor's timezone
+WORKING_HOURS = os.environ.get("WORKING_HOURS", "09:00-18:00")
+WORKING_DAYS = os.environ.get("WORKING_DAYS", "0,1,2,3,4")  # Monday is 0
+# Lessons longer than this are not expected; bounds the availability index scan
+MAX_LESSON_HOURS = int(os.environ.get("MAX_LESSON_HOURS", "12"))
+# Longest from/to range availability and planning will walk day by day
+MAX_AVAILABILITY_DAYS = int(os.environ.get("MAX_AVAILABILITY_DAYS", "366"))
+
+# "documents" keeps one document per lesson; "buckets" groups a tutor's
+# lessons into one document per month of start_time
+LESSON_STORAGE = os.environ.get("LESSON_STORAGE", "documents")
+
+# "string" keeps UUID strings in an extra `id` field; "binary" stores them as
+# BSON binary UUIDs (subtype 4) in `_id`. Run migrate_ids.py before switching.
+ID_STORAGE = os.environ.get("ID_STORAGE", "string")
+
+# Background jobs (see worker.py)
+JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "5"))
+
+# Lesson change events tailed by scheduler.py
+LESSON_EVENTS_BYTES = int(os.environ.get("LESSON_EVENTS_BYTES", str(16 * 1024 * 1024)))
+
+# Idempotency-Key support on create endpoints. Stored responses expire after
+# the TTL; a duplicate arriving while the first attempt is still running waits
+# up to IDEMPOTENCY_WAIT_SECONDS for its result. Claims older than the lease
+# are assumed abandoned (e.g. the process died) and can be taken over.
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get("IDEMPOTENCY_WAIT_SECONDS", "10"))
+IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get("IDEMPOTENCY_LEASE_SECONDS", "60"))
+
+# Per-process cache of each tutor's student ids for lesson ownership checks.
+# Other workers' deletes are only seen once an entry expires.
+OWNERSHIP_CACHE_TTL_SECONDS = float(os.environ.get("OWNERSHIP_CACHE_TTL_SECONDS", "30"))
+OWNERSHIP_CACHE_MAX_TUTORS = int(os.environ.get("OWNERSHIP_CACHE_MAX_TUTORS", "10000"))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token")
 
+# Entity ids
+# The API always exposes ids as strings. Everything read from the database
+# stays in stored form (str or uuid.UUID) so it can be put straight back
+# into queries; db_id() converts API strings on the way in.
+BINARY_IDS = ID_STORAGE == "binary"
+ID_KEY = "_id" if BINARY_IDS else "id"
+REFERENCE_FIELDS = ("tutor_id", "student_id")
+
+def db_id(value):
+    if BINARY_IDS and isinstance(value, str):
+        try:
+            return uuid.UUID(value)
+        except ValueError:
+            return value
+    return value
+
+def api_id(value):
+    return str(value) if isinstance(value, uuid.UUID) else value
+
+def doc_id(doc: dict):
+    return doc["id"] if "id" in doc else doc["_id"]
+
+def to_db(doc: dict, rename_id: bool = True) -> dict:
+    """Convert a model dict's ids to stored form, moving `id` to `_id` for binary ids."""
+    doc = dict(doc)
+    if "id" in doc:
+        doc["id"] = db_id(doc["id"])
+        if BINARY_IDS and rename_id:
+            doc["_id"] = doc.pop("id")
+    for field in REFERENCE_FIELDS:
+        if field in doc:
+            doc[field] = db_id(doc[field])
+    return doc
+
+EntityId = Annotated[str, BeforeValidator(api_id)]
+PrimaryId = Field(default_factory=lambda: str(uuid.uuid4()), validation_alias=AliasChoices("id", "_id"))
+
+# Sharding plan: every tutor-owned collection is sharded on tutor_id first,
+# so all tutor-scoped routes (which always filter on tutor_id) are routed to
+# a single shard. The id suffix lets a very large tutor's data split across
+# chunks. tutor ids are random UUIDs, so ranged keys distribute evenly
+# without hashing. tutors itself stays unsharded; it is small and looked up
+# by email. Admin-wide lists, scope=all search and reports are deliberately
+# scatter-gather.
+SHARD_KEYS = {
+    "students": [("tutor_id", 1), (ID_KEY, 1)],
+    "lessons": [("tutor_id", 1), (ID_KEY, 1)],
+    "lesson_buckets": [("tutor_id", 1), ("month", 1)],
+    "lesson_rollups": [("tutor_id", 1), ("day", 1)],
+}
+
 # Define Models
 class Token(BaseModel):
     access_token: str
@@ -54,7 +440,7 @@ class TutorCreate(TutorBase):
     is_admin: bool = False
 
 class Tutor(TutorBase):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: EntityId = PrimaryId
     is_admin: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -67,15 +453,28 @@ class StudentCreate(StudentBase):
     pass
 
 class Student(StudentBase):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    tutor_id: str
+    id: EntityId = PrimaryId
+    tutor_id: EntityId
     payment_status: bool = False
     homework_status: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class StudentStatusUpdate(BaseModel):
+    id: EntityId
+    payment_status: Optional[bool] = None
+    homework_status: Optional[bool] = None
+
+class StudentStatusBatch(BaseModel):
+    updates: List[StudentStatusUpdate] = Field(min_length=1, max_length=1000)
+
+class StudentStatus(BaseModel):
+    id: EntityId = Field(validation_alias=AliasChoices("id", "_id"))
+    payment_status: bool = False
+    homework_status: bool = False
+
 class LessonBase(BaseModel):
     title: str
-    student_id: str
+    student_id: EntityId
     start_time: datetime
     end_time: datetime
     subject: str
@@ -85,10 +484,73 @@ class LessonCreate(LessonBase):
     pass
 
 class Lesson(LessonBase):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    tutor_id: str
+    id: EntityId = PrimaryId
+    tutor_id: EntityId
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class ExpandedLesson(Lesson):
+    student: Optional[Student] = None
+    tutor: Optional[Tutor] = None
+
+class SearchResult(BaseModel):
+    type: Literal["student", "lesson"]
+    id: EntityId
+    score: float
+    student: Optional[Student] = None
+    lesson: Optional[Lesson] = None
+
+class SearchResults(BaseModel):
+    query: str
+    skip: int
+    limit: int
+    has_more: bool
+    results: List[SearchResult]
+
+class Job(BaseModel):
+    id: str
+    name: str
+    status: Literal["queued", "running", "done", "failed"]
+    attempts: int
+    run_at: datetime
+    created_at: datetime
+    updated_at: datetime
+    last_error: Optional[str] = None
+    result: Optional[dict] = None
+
+class ReportRow(BaseModel):
+    period: datetime
+    key: Optional[EntityId] = None
+    lesson_count: int
+    hours: float
+    payment_status: Optional[bool] = None
+
+class Slot(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+class LessonRequest(BaseModel):
+    student_id: str
+    duration_minutes: int = Field(60, gt=0)
+    count: int = Field(1, gt=0)
+
+class PlanCreate(BaseModel):
+    start: datetime = Field(alias="from")
+    end: datetime = Field(alias="to")
+    requests: List[LessonRequest]
+    day_start: Optional[str] = None
+    day_end: Optional[str] = None
+    weekdays: Optional[str] = None
+    timezone: str = "UTC"
+
+class PlannedLesson(BaseModel):
+    student_id: str
+    start_time: datetime
+    end_time: datetime
+
+class Plan(BaseModel):
+    placed: List[PlannedLesson]
+    unplaced: List[LessonRequest]
+
 # Helper functions
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -96,6 +558,550 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# Rate limiting
+limit_metrics = Counter()
+
+def too_many_requests(retry_after: float, detail: str = "Too many requests") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+def parse_rate(spec: str):
+    try:
+        rate, burst = spec.split("/")
+        rate, burst = float(rate), int(burst)
+    except ValueError:
+        raise ValueError(f"Invalid rate limit {spec!r}, expected '<requests per second>/<burst>'") from None
+    if not rate > 0 or burst < 1:
+        raise ValueError(f"Invalid rate limit {spec!r}, rate must be > 0 and burst >= 1")
+    return rate, burst
+
+class TokenBucketLimiter:
+    """In-process token buckets, LRU-bounded so key floods cannot grow memory."""
+
+    def __init__(self, name: str, spec: str, max_keys: int = 100_000, workers: int = 1):
+        self.name = name
+        rate, burst = parse_rate(spec)
+        # Each worker process holds its own buckets; split the limit between them
+        self.rate, self.burst = rate / workers, max(1.0, burst / workers)
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+
+    async def hit(self, key: str, cost: int = 1) -> float:
+        """Take cost tokens for key; return 0 if allowed, else seconds until retry.
+
+        cost=0 only checks that a token is available.
+        """
+        now = time.monotonic()
+        tokens, updated = self.buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= cost
+        else:
+            retry_after = (1 - tokens) / self.rate
+        self.buckets[key] = (tokens, now)
+        if len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return retry_after
+
+class RedisTokenBucketLimiter(TokenBucketLimiter):
+    """Token buckets shared by all workers through Redis."""
+
+    SCRIPT = """
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(data[1]) or burst
+    local ts = tonumber(data[2]) or now
+    tokens = math.min(burst, tokens + (now - ts) * rate)
+    local retry = 0
+    if tokens >= 1 then tokens = tokens - cost else retry = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(retry)
+    """
+
+    def __init__(self, name: str, spec: str, redis_client):
+        super().__init__(name, spec)
+        self.script = redis_client.register_script(self.SCRIPT)
+
+    async def hit(self, key: str, cost: int = 1) -> float:
+        result = await self.script(keys=[f"ratelimit:{self.name}:{key}"], args=[self.rate, self.burst, cost])
+        return float(result)
+
+def make_limiter(name: str, spec: str) -> TokenBucketLimiter:
+    if REDIS_URL:
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            raise RuntimeError("REDIS_URL is set but the redis package is not installed") from None
+        return RedisTokenBucketLimiter(name, spec, aioredis.from_url(REDIS_URL))
+    return TokenBucketLimiter(name, spec, workers=max(1, UVICORN_WORKERS))
+
+login_ip_limiter = make_limiter("login_ip", LOGIN_IP_RATE)
+login_account_limiter = make_limiter("login_account", LOGIN_ACCOUNT_RATE)
+register_ip_limiter = make_limiter("register_ip", REGISTER_IP_RATE)
+write_tutor_limiter = make_limiter("write_tutor", WRITE_TUTOR_RATE)
+
+async def enforce_rate_limit(limiter: TokenBucketLimiter, key: str, cost: int = 1):
+    retry_after = await limiter.hit(key, cost)
+    if retry_after > 0:
+        limit_metrics[f"{limiter.name}_rejected"] += 1
+        raise too_many_requests(retry_after)
+    limit_metrics[f"{limiter.name}_allowed"] += 1
+
+def client_ip(request: Request) -> str:
+    peer = request.client.host if request.client else "unknown"
+    if peer in TRUSTED_PROXIES:
+        return request.headers.get("x-real-ip", peer)
+    return peer
+
+class ConcurrencyLimiter:
+    """Bounds CPU-heavy work and rejects once too many callers are queued."""
+
+    def __init__(self, name: str, limit: int, max_waiting: int):
+        self.name = name
+        self.semaphore = asyncio.Semaphore(limit)
+        self.max_waiting = max_waiting
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.waiting >= self.max_waiting:
+            limit_metrics[f"{self.name}_shed"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            yield
+        finally:
+            self.semaphore.release()
+
+bcrypt_limiter = ConcurrencyLimiter("bcrypt", BCRYPT_CONCURRENCY, BCRYPT_MAX_WAITING)
+
+async def verify_password_limited(plain_password, hashed_password):
+    async with bcrypt_limiter.slot():
+        return await run_in_threadpool(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_limited(password):
+    async with bcrypt_limiter.slot():
+        return await run_in_threadpool(get_password_hash, password)
+
+def make_etag(*parts) -> str:
+    """Weak ETag from the version parts of a document or collection.
+
+    Weak because the same version is served gzipped or not, and nginx
+    weakens strong tags on the responses it compresses anyway.
+    """
+    digest = hashlib.sha1(":".join(str(p) for p in parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+def set_cache_headers(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = READ_CACHE_CONTROL
+    response.headers["Vary"] = "Authorization"
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_cache_headers(response, etag)
+    return response
+
+async def bump_tutor_version(tutor_id: str, *fields: str):
+    """Invalidate per-tutor list ETags after a write."""
+    await db.tutors.update_one(
+        {ID_KEY: db_id(tutor_id)}, {"$inc": {field: 1 for field in fields}}
+    )
+
+# Student ownership cache
+class StudentOwnershipCache:
+    """Read-through cache of the student ids each tutor owns, LRU-bounded by tutor.
+
+    A tutor's set is loaded with one projected query and kept current by this
+    process's student writes. An id missing from the set is checked against
+    the database before being refused, so students created by another worker
+    are never rejected; deletes elsewhere are picked up when the entry expires.
+    """
+
+    def __init__(self, ttl: float, max_tutors: int):
+        self.ttl = ttl
+        self.max_tutors = max_tutors
+        self.entries = OrderedDict()
+
+    def get(self, tutor_id):
+        entry = self.entries.get(tutor_id)
+        if entry is None or entry[0] < time.monotonic():
+            self.entries.pop(tutor_id, None)
+            return None
+        self.entries.move_to_end(tutor_id)
+        return entry[1]
+
+    async def load(self, tutor_id) -> set:
+        expires = time.monotonic() + self.ttl
+        cursor = db.students.find({"tutor_id": tutor_id}, {ID_KEY: 1})
+        owned = {doc[ID_KEY] async for doc in cursor}
+        self.entries[tutor_id] = (expires, owned)
+        self.entries.move_to_end(tutor_id)
+        if len(self.entries) > self.max_tutors:
+            self.entries.popitem(last=False)
+        return owned
+
+    async def owns(self, tutor_id, student_id: str) -> bool:
+        student_id = db_id(student_id)
+        owned = self.get(tutor_id)
+        if owned is None:
+            owned = await self.load(tutor_id)
+        if student_id in owned:
+            return True
+        if await db.students.find_one({ID_KEY: student_id, "tutor_id": tutor_id}, {"_id": 1}) is None:
+            return False
+        owned.add(student_id)
+        return True
+
+    def add(self, tutor_id, student_id):
+        owned = self.get(tutor_id)
+        if owned is not None:
+            owned.add(student_id)
+
+    def discard(self, tutor_id, student_id):
+        owned = self.get(tutor_id)
+        if owned is not None:
+            owned.discard(student_id)
+
+    def forget(self, tutor_id):
+        self.entries.pop(tutor_id, None)
+
+student_owners = StudentOwnershipCache(OWNERSHIP_CACHE_TTL_SECONDS, OWNERSHIP_CACHE_MAX_TUTORS)
+
+# Datetimes
+def naive_utc(value: datetime) -> datetime:
+    """Convert an aware datetime to naive UTC, the form Mongo returns; naive ones are taken as UTC."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def as_datetime(value) -> datetime:
+    """Parse an ISO string if needed and return naive UTC, matching what Mongo stores."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return naive_utc(value)
+
+# Search
+SEARCH_MAX_LIMIT = 100
+# Added to the text score so that "Mat" ranks "Maths" ahead of loose matches
+SEARCH_PREFIX_BOOST = 10.0
+
+async def drop_index_if_exists(collection, name: str):
+    try:
+        await collection.drop_index(name)
+    except OperationFailure:
+        pass
+
+async def search_collection(collection, base_filter: dict, q: str, prefix_field: str, text_fields: tuple, fetch: int):
+    """Ranked text matches merged with case-insensitive prefix matches.
+
+    Both queries are sorted down to the id, so the candidates cut at `fetch`
+    do not change between pages. Text indexes are prefixed by tutor_id and
+    only serve tutor-scoped searches; scope=all scans with a regex instead.
+    """
+    hits = {}
+    if "tutor_id" in base_filter:
+        text_cursor = collection.find(
+            {**base_filter, "$text": {"$search": q}},
+            {"score": {"$meta": "textScore"}},
+        ).sort([("score", {"$meta": "textScore"}), (ID_KEY, 1)])
+    else:
+        text_cursor = collection.find({**base_filter, "$or": [
+            {field: {"$regex": re.escape(q), "$options": "i"}} for field in text_fields
+        ]}).sort([(prefix_field, 1), (ID_KEY, 1)])
+    async for doc in text_cursor.limit(fetch):
+        hits[doc_id(doc)] = (doc.pop("score", 1.0), doc)
+
+    prefix_filter = {**base_filter, prefix_field: {"$regex": f"^{re.escape(q)}", "$options": "i"}}
+    async for doc in collection.find(prefix_filter).sort([(prefix_field, 1), (ID_KEY, 1)]).limit(fetch):
+        score, _ = hits.get(doc_id(doc), (0.0, doc))
+        hits[doc_id(doc)] = (score + SEARCH_PREFIX_BOOST, doc)
+    return hits.values()
+
+# Lesson storage
+class DocumentLessonStore:
+    """One document per lesson in db.lessons."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def create_indexes(self):
+        await self.collection.create_index([("tutor_id", 1), ("title", 1)])
+        await self.collection.create_index([("tutor_id", 1), ("start_time", 1)])
+        # Upcoming-lesson scans for reminders
+        await self.collection.create_index([("start_time", 1)])
+        # Incremental analytics exports
+        await self.collection.create_index([("created_at", 1)])
+        # Replaced by the tutor-prefixed index; a collection has one text index
+        await drop_index_if_exists(self.collection, "lessons_text")
+        await self.collection.create_index(
+            [("tutor_id", 1), ("title", "text"), ("subject", "text"), ("notes", "text")],
+            weights={"title": 5, "subject": 3, "notes": 1},
+            name="lessons_tutor_text",
+        )
+
+    async def insert(self, lesson: dict):
+        await self.collection.insert_one({**to_db(lesson), "version": 0})
+
+    async def find_one(self, tutor_id, lesson_id: str, session=None):
+        return await for_reads(self.collection, session).find_one(
+            {ID_KEY: db_id(lesson_id), "tutor_id": db_id(tutor_id)}, session=session
+        )
+
+    async def update(self, tutor_id, lesson_id: str, fields: dict):
+        """Update a lesson; return (before, after), or None if it does not exist.
+
+        The pre-image comes from the write itself, so concurrent writers each
+        see the version they replaced.
+        """
+        fields = to_db(fields)
+        before = await self.collection.find_one_and_update(
+            {ID_KEY: db_id(lesson_id), "tutor_id": db_id(tutor_id)},
+            {"$set": fields, "$inc": {"version": 1}},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if before is None:
+            return None
+        return before, {**before, **fields, "version": before.get("version", 0) + 1}
+
+    async def delete(self, tutor_id, lesson_id: str):
+        """Delete a lesson; return what was deleted, or None."""
+        return await self.collection.find_one_and_delete({ID_KEY: db_id(lesson_id), "tutor_id": db_id(tutor_id)})
+
+    async def delete_many(self, tutor_id, student_id: Optional[str] = None):
+        match = {"tutor_id": db_id(tutor_id)}
+        if student_id:
+            match["student_id"] = db_id(student_id)
+        await self.collection.delete_many(match)
+
+    def flat_stages(self, match: dict) -> list:
+        """Pipeline stages yielding one flat lesson document per lesson."""
+        return [{"$match": match}]
+
+    async def find(self, match: dict, projection: Optional[dict] = None, sort=None, limit: int = 0, session=None):
+        cursor = for_reads(self.collection, session).find(match, projection, session=session)
+        if sort:
+            cursor = cursor.sort(sort)
+        return await cursor.to_list(limit or None)
+
+    def iterate(self, match: dict, batch_size: int = 1000):
+        """Stream flat lessons without materialising them, e.g. for exports."""
+        return self.collection.find(match, batch_size=batch_size)
+
+    async def count(self) -> int:
+        return await self.collection.count_documents({})
+
+    async def search(self, base_filter: dict, q: str, fetch: int):
+        return await search_collection(self.collection, base_filter, q, "title", ("title", "subject", "notes"), fetch)
+
+class BucketLessonStore(DocumentLessonStore):
+    """Lessons embedded in per-tutor monthly bucket documents.
+
+    A bucket is {tutor_id, month, lessons: [...]}; embedded lessons omit
+    tutor_id. Range reads touch one document per month instead of one per
+    lesson, and the per-lesson index entries and duplicated tutor_id go
+    away. Lookups by id use a multikey index on lessons.id.
+    """
+
+    async def create_indexes(self):
+        await self.collection.create_index([("tutor_id", 1), ("month", 1)], unique=True)
+        await self.collection.create_index([("tutor_id", 1), ("lessons.id", 1)])
+        await self.collection.create_index([("month", 1)])
+
+    @staticmethod
+    def month_of(value) -> datetime:
+        # Mongo stores UTC, so an offset time belongs to its UTC month
+        value = as_datetime(value)
+        return datetime(value.year, value.month, 1)
+
+    @staticmethod
+    def flatten(bucket: dict, lesson: dict) -> dict:
+        return {**lesson, "tutor_id": bucket["tutor_id"]}
+
+    async def insert(self, lesson: dict):
+        lesson = to_db(lesson, rename_id=False)
+        embedded = {k: v for k, v in lesson.items() if k != "tutor_id"}
+        await self.collection.update_one(
+            {"tutor_id": lesson["tutor_id"], "month": self.month_of(lesson["start_time"])},
+            {"$push": {"lessons": {**embedded, "version": 0}}},
+            upsert=True,
+        )
+
+    async def find_one(self, tutor_id, lesson_id: str, session=None):
+        bucket = await for_reads(self.collection, session).find_one(
+            {"tutor_id": db_id(tutor_id), "lessons.id": db_id(lesson_id)},
+            {"tutor_id": 1, "month": 1, "lessons.$": 1},
+            session=session,
+        )
+        return self.flatten(bucket, bucket["lessons"][0]) if bucket else None
+
+    async def update(self, tutor_id, lesson_id: str, fields: dict):
+        existing = await self.find_one(tutor_id, lesson_id)
+        if existing is None:
+            return None
+        tutor_id, lesson_id = existing["tutor_id"], existing["id"]
+        fields = to_db(fields, rename_id=False)
+        month = self.month_of(existing["start_time"])
+        if month == self.month_of(fields["start_time"]):
+            bucket = await self.collection.find_one_and_update(
+                {"tutor_id": tutor_id, "month": month, "lessons.id": lesson_id},
+                {"$set": {f"lessons.$.{key}": value for key, value in fields.items()},
+                 "$inc": {"lessons.$.version": 1}},
+                projection={"tutor_id": 1, "lessons.$": 1},
+                return_document=ReturnDocument.BEFORE,
+            )
+            if bucket is None:
+                return None
+            before = self.flatten(bucket, bucket["lessons"][0])
+            return before, {**before, **fields, "version": before.get("version", 0) + 1}
+        # start_time moved to another month. Copy the lesson into its new bucket
+        # before pulling it from the old one, so a failure in between leaves it
+        # readable rather than lost. The $ne guard keeps concurrent moves from
+        # pushing two copies: the loser hits the unique (tutor_id, month) index.
+        new_month = self.month_of(fields["start_time"])
+        updated = {**existing, **fields, "version": existing.get("version", 0) + 1}
+        embedded = {k: v for k, v in updated.items() if k != "tutor_id"}
+        try:
+            await self.collection.update_one(
+                {"tutor_id": tutor_id, "month": new_month, "lessons.id": {"$ne": lesson_id}},
+                {"$push": {"lessons": embedded}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return None
+        bucket = await self.collection.find_one_and_update(
+            {"tutor_id": tutor_id, "month": {"$ne": new_month}, "lessons.id": lesson_id},
+            {"$pull": {"lessons": {"id": lesson_id}}},
+            projection={"tutor_id": 1, "lessons": {"$elemMatch": {"id": lesson_id}}},
+        )
+        if bucket is None:
+            # Deleted meanwhile; take back the copy
+            await self.collection.update_one(
+                {"tutor_id": tutor_id, "month": new_month}, {"$pull": {"lessons": {"id": lesson_id}}}
+            )
+            return None
+        return self.flatten(bucket, bucket["lessons"][0]), updated
+
+    async def delete(self, tutor_id, lesson_id: str):
+        bucket = await self.collection.find_one_and_update(
+            {"tutor_id": db_id(tutor_id), "lessons.id": db_id(lesson_id)},
+            {"$pull": {"lessons": {"id": db_id(lesson_id)}}},
+            projection={"tutor_id": 1, "lessons": {"$elemMatch": {"id": db_id(lesson_id)}}},
+        )
+        return self.flatten(bucket, bucket["lessons"][0]) if bucket else None
+
+    async def delete_many(self, tutor_id, student_id: Optional[str] = None):
+        if student_id:
+            await self.collection.update_many(
+                {"tutor_id": db_id(tutor_id)}, {"$pull": {"lessons": {"student_id": db_id(student_id)}}}
+            )
+        else:
+            await self.collection.delete_many({"tutor_id": db_id(tutor_id)})
+
+    def flat_stages(self, match: dict) -> list:
+        bucket_match = {}
+        if "tutor_id" in match:
+            bucket_match["tutor_id"] = match["tutor_id"]
+        start_range = match.get("start_time")
+        if isinstance(start_range, dict):
+            month_range = {}
+            for op in ("$gte", "$gt"):
+                if op in start_range:
+                    month_range["$gte"] = self.month_of(start_range[op])
+            for op in ("$lt", "$lte"):
+                if op in start_range:
+                    month_range[op] = start_range[op]
+            if month_range:
+                bucket_match["month"] = month_range
+        lesson_match = {k: v for k, v in match.items() if k != "tutor_id"}
+        stages = [
+            {"$match": bucket_match},
+            {"$unwind": "$lessons"},
+            {"$replaceRoot": {"newRoot": {"$mergeObjects": ["$lessons", {"tutor_id": "$tutor_id"}]}}},
+        ]
+        if lesson_match:
+            stages.append({"$match": lesson_match})
+        return stages
+
+    async def find(self, match: dict, projection: Optional[dict] = None, sort=None, limit: int = 0, session=None):
+        pipeline = self.flat_stages(match)
+        if sort:
+            pipeline.append({"$sort": dict(sort) if isinstance(sort, list) else {sort: 1}})
+        if limit:
+            pipeline.append({"$limit": limit})
+        if projection:
+            pipeline.append({"$project": projection})
+        return await for_reads(self.collection, session).aggregate(pipeline, session=session).to_list(None)
+
+    def iterate(self, match: dict, batch_size: int = 1000):
+        return self.collection.aggregate(self.flat_stages(match), batchSize=batch_size)
+
+    async def count(self) -> int:
+        result = await self.collection.aggregate([
+            {"$group": {"_id": None, "count": {"$sum": {"$size": "$lessons"}}}}
+        ]).to_list(1)
+        return result[0]["count"] if result else 0
+
+    async def import_from(self, source):
+        """Copy a one-document-per-lesson collection into buckets."""
+        await source.aggregate([
+            {"$addFields": {
+                "id": {"$ifNull": ["$id", "$_id"]},
+                "month": {"$dateTrunc": {"date": "$start_time", "unit": "month"}},
+            }},
+            {"$group": {"_id": {"tutor_id": "$tutor_id", "month": "$month"}, "lessons": {"$push": "$$ROOT"}}},
+            {"$project": {"_id": 0, "tutor_id": "$_id.tutor_id", "month": "$_id.month", "lessons": 1}},
+            {"$unset": ["lessons._id", "lessons.tutor_id", "lessons.month"]},
+            {"$merge": {"into": self.collection.name, "on": ["tutor_id", "month"],
+                        "whenMatched": "replace", "whenNotMatched": "insert"}},
+        ]).to_list(None)
+
+    async def search(self, base_filter: dict, q: str, fetch: int):
+        """Unindexed scan of the tutor's buckets; text indexes do not rank embedded lessons."""
+        pattern = re.escape(q)
+        lessons = await self.find(
+            {**base_filter, "$or": [
+                {field: {"$regex": pattern, "$options": "i"}} for field in ("title", "subject", "notes")
+            ]},
+            sort=[("title", 1), ("id", 1)],
+            limit=fetch,
+        )
+        prefix = re.compile(f"^{pattern}", re.IGNORECASE)
+        return [
+            (SEARCH_PREFIX_BOOST + 1.0 if prefix.match(lesson["title"]) else 1.0, lesson)
+            for lesson in lessons
+        ]
+
+if LESSON_STORAGE == "buckets":
+    lesson_store = BucketLessonStore(db.lesson_buckets)
+else:
+    lesson_store = DocumentLessonStore(db.lessons)
+
 async def get_tutor_by_email(email: str):
     tutor = await db.tutors.find_one({"email": email})
     if tutor:
@@ -106,20 +1112,28 @@ async def authenticate_tutor(email: str, password: str):
     tutor = await get_tutor_by_email(email)
     if not tutor:
         return False
-    if not verify_password(password, tutor["password"]):
+    if not await verify_password_limited(password, tutor["password"]):
         return False
     return tutor
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    if SIGNING_KEY is None:
+        raise HTTPException(status_code=503, detail="This server cannot issue tokens")
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    lifetime = expires_delta.total_seconds() if expires_delta else 15 * 60
+    to_encode.update({"exp": int(time.time() + lifetime)})
+    encoded_jwt = jwt.encode(to_encode, SIGNING_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def decode_access_token(token: str) -> dict:
+    """Verify token, or return its cached claims if it was verified before."""
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = jwt.decode(token, VERIFICATION_KEY, algorithms=[ALGORITHM], options={"require": ["exp"]})
+        token_cache.put(key, payload)
+    return payload
+
 async def get_current_tutor(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -127,7 +1141,7 @@ async def get_current_tutor(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
@@ -137,13 +1151,287 @@ async def get_current_tutor(token: str = Depends(oauth2_scheme)):
     tutor = await get_tutor_by_email(email=token_data.email)
     if tutor is None:
         raise credentials_exception
+    tutor["id"] = doc_id(tutor)
+    current = request_log.get()
+    if current is not None:
+        current.tutor_id = api_id(tutor["id"])
     return tutor
 
+# Helper functions to check permissions
+async def get_admin_tutor(current_tutor = Depends(get_current_tutor)):
+    if not current_tutor.get("is_admin", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to perform this action",
+        )
+    return current_tutor
+
+async def causal_session(request: Request):
+    """Causally consistent session for reads that may go to a secondary, or None.
+
+    The session is advanced only to the client's session token, so a
+    secondary waits for the client's own writes and nothing newer. Routes
+    that build ETags from the tutor's versions read them in the session too
+    (see tutor_versions), so the tag matches the data served.
+    """
+    if READ_PREFERENCE == ReadPreference.PRIMARY:
+        yield None
+        return
+    cluster_time, operation_time = decode_session_token(request.headers.get(SESSION_TOKEN_HEADER))
+    async with await client.start_session(causal_consistency=True) as session:
+        if cluster_time is not None:
+            session.advance_cluster_time(cluster_time)
+        if operation_time is not None:
+            session.advance_operation_time(operation_time)
+        yield session
+
+async def tutor_versions(current_tutor: dict, session) -> dict:
+    """The tutor's list versions, read in session when reads may be served by a secondary."""
+    if session is None:
+        return current_tutor
+    versions = await for_reads(db.tutors, session).find_one(
+        {ID_KEY: current_tutor["id"]}, {"version": 1, "students_version": 1, "lessons_version": 1}, session=session
+    )
+    return versions or {}
+
+async def limit_writes(current_tutor = Depends(get_current_tutor)):
+    await enforce_rate_limit(write_tutor_limiter, current_tutor["id"])
+
+async def limit_registrations(request: Request):
+    await enforce_rate_limit(register_ip_limiter, client_ip(request))
+
+class IdempotentCall:
+    """A claimed Idempotency-Key. `replay` holds the stored response of an earlier attempt."""
+
+    def __init__(self, key_id: Optional[str] = None, replay: Optional[dict] = None):
+        self.key_id = key_id
+        self.replay = replay
+        self.saved = False
+
+    async def save(self, result: BaseModel):
+        if self.key_id is not None:
+            await db.idempotency_keys.update_one(
+                {"_id": self.key_id},
+                {"$set": {"status": "done", "response": result.model_dump(mode="json")}},
+            )
+            self.saved = True
+        return result
+
+@asynccontextmanager
+async def claim_idempotency_key(request: Request, response: Response, scope: str):
+    key = request.headers.get("Idempotency-Key")
+    if not key:
+        yield IdempotentCall()
+        return
+    if len(key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+    key_id = hashlib.sha256(f"{request.url.path}\0{scope}\0{key}".encode()).hexdigest()
+    # Keyed, so a stored fingerprint of a create_tutor body cannot be used to
+    # guess the password offline
+    fingerprint = hmac.new(SECRET_KEY.encode(), await request.body(), hashlib.sha256).hexdigest()
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    existing = None
+    while True:
+        try:
+            # _id is unique, so exactly one concurrent attempt wins the claim
+            await db.idempotency_keys.insert_one({
+                "_id": key_id, "status": "pending", "fingerprint": fingerprint, "created_at": datetime.utcnow(),
+            })
+            break
+        except DuplicateKeyError:
+            existing = await db.idempotency_keys.find_one({"_id": key_id})
+        if existing is None:
+            continue  # released by a failed attempt; claim it again
+        if existing["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        if existing["status"] == "done":
+            break
+        if existing["created_at"] < datetime.utcnow() - timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS):
+            await db.idempotency_keys.delete_one({"_id": key_id, "status": "pending", "created_at": existing["created_at"]})
+            existing = None
+            continue
+        if time.monotonic() >= deadline:
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still in progress",
+                headers={"Retry-After": "1"},
+            )
+        existing = None
+        await asyncio.sleep(0.05)
+    if existing is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+        yield IdempotentCall(replay=existing["response"])
+        return
+    call = IdempotentCall(key_id)
+    try:
+        yield call
+    finally:
+        if not call.saved:
+            # Failed attempts release the key so the client can retry
+            await db.idempotency_keys.delete_one({"_id": key_id, "status": "pending"})
+
+async def tutor_idempotency(request: Request, response: Response, current_tutor = Depends(get_current_tutor)):
+    async with claim_idempotency_key(request, response, str(api_id(current_tutor["id"]))) as call:
+        yield call
+
+async def public_idempotency(request: Request, response: Response):
+    async with claim_idempotency_key(request, response, "public") as call:
+        yield call
+
+class BatchLoader:
+    """Request-scoped loader: every id requested is fetched with one $in query."""
+
+    def __init__(self, collection, projection: Optional[dict] = None, scope: Optional[dict] = None):
+        self.collection = collection
+        self.projection = projection
+        # e.g. {"tutor_id": ...} so the query targets a single shard
+        self.scope = scope or {}
+        self.cache = {}
+
+    async def load_many(self, ids) -> dict:
+        missing = list({id_ for id_ in ids if id_ not in self.cache})
+        if missing:
+            for id_ in missing:
+                self.cache[id_] = None
+            async for doc in self.collection.find({**self.scope, ID_KEY: {"$in": missing}}, self.projection):
+                self.cache[doc_id(doc)] = doc
+        return {id_: self.cache[id_] for id_ in ids}
+
+LESSON_EXPANSIONS = {"student", "tutor"}
+
+def parse_expand(expand: Optional[str]) -> set:
+    fields = {field.strip() for field in (expand or "").split(",") if field.strip()}
+    unknown = fields - LESSON_EXPANSIONS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot expand: {', '.join(sorted(unknown))}")
+    return fields
+
+async def expand_lessons(lessons: List[dict], fields: set, tutor_id=None) -> List[ExpandedLesson]:
+    students, tutors = {}, {}
+    if "student" in fields:
+        scope = {"tutor_id": tutor_id} if tutor_id is not None else None
+        students = await BatchLoader(db.students, scope=scope).load_many([lesson["student_id"] for lesson in lessons])
+    if "tutor" in fields:
+        tutors = await BatchLoader(db.tutors, {"password": 0}).load_many([lesson["tutor_id"] for lesson in lessons])
+    expanded = []
+    for lesson in lessons:
+        student = students.get(lesson["student_id"])
+        tutor = tutors.get(lesson["tutor_id"])
+        expanded.append(ExpandedLesson(
+            **lesson,
+            student=Student(**student) if student else None,
+            tutor=Tutor(**tutor) if tutor else None,
+        ))
+    return expanded
+
+# Middleware
+profile_counter = itertools.count(1)
+
+def start_profiler():
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return None  # another request is already being profiled
+        return profiler
+    # Async mode attributes time to this request's await chain only
+    profiler = Profiler(interval=PROFILE_INTERVAL, async_mode="enabled")
+    profiler.start()
+    return profiler
+
+def stop_profiler(profiler):
+    """Stop profiler; return (trace bytes, file extension)."""
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        profiler.create_stats()
+        # Same format as Stats.dump_stats, loadable with pstats or snakeviz
+        return marshal.dumps(profiler.stats), "pstats"
+    from pyinstrument.renderers import SpeedscopeRenderer
+    profiler.stop()
+    return profiler.output(SpeedscopeRenderer()).encode(), "speedscope.json"
+
+def save_profile(name: str, trace: bytes):
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    (PROFILE_DIR / name).write_bytes(trace)
+    profiles = sorted(PROFILE_DIR.iterdir(), key=lambda path: path.stat().st_mtime)
+    for path in profiles[:max(0, len(profiles) - PROFILE_KEEP)]:
+        path.unlink(missing_ok=True)
+
+async def profiling_requested(request: Request) -> bool:
+    if request.headers.get("x-profile") != "1" and request.query_params.get("profile") != "1":
+        return False
+    token = await oauth2_scheme(request)
+    await get_admin_tutor(await get_current_tutor(token))
+    return True
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    try:
+        requested = await profiling_requested(request)
+    except HTTPException as exc:
+        return JSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+    sampled = PROFILE_SAMPLE_EVERY > 0 and next(profile_counter) % PROFILE_SAMPLE_EVERY == 0
+    profiler = start_profiler() if requested or sampled else None
+    if profiler is None:
+        return await call_next(request)
+    try:
+        response = await call_next(request)
+    finally:
+        trace, extension = stop_profiler(profiler)
+    endpoint = getattr(request.scope.get("endpoint"), "__name__", "unmatched")
+    current = request_log.get()
+    request_id = current.request_id if current is not None else uuid.uuid4().hex
+    name = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{endpoint}-{request_id}.{extension}"
+    await run_in_threadpool(save_profile, name, trace)
+    if requested:
+        response.headers["X-Profile"] = name
+    return response
+
+@app.middleware("http")
+async def log_requests(request: Request, call_next):
+    current = RequestLog(request.headers.get("x-request-id") or uuid.uuid4().hex)
+    current.observe(*decode_session_token(request.headers.get(SESSION_TOKEN_HEADER)))
+    request_log.set(current)
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers["X-Request-ID"] = current.request_id
+        if current.operation_time is not None:
+            response.headers[SESSION_TOKEN_HEADER] = encode_session_token(current.cluster_time, current.operation_time)
+        return response
+    finally:
+        latency_ms = (time.perf_counter() - started) * 1000
+        if status_code >= 500 or latency_ms >= SLOW_REQUEST_MS or random.random() < REQUEST_LOG_SAMPLE_RATE:
+            endpoint = request.scope.get("endpoint")
+            logger.info("request", extra={
+                "event": "request",
+                "request_id": current.request_id,
+                "tutor_id": current.tutor_id,
+                "method": request.method,
+                "path": request.url.path,
+                "route": getattr(endpoint, "__name__", None),
+                "status": status_code,
+                "latency_ms": round(latency_ms, 2),
+                "db_ms": round(current.db_ms, 2),
+                "db_commands": current.db_commands,
+                "slow": latency_ms >= SLOW_REQUEST_MS,
+            })
+
 # Authentication routes
 @api_router.post("/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    await enforce_rate_limit(login_ip_limiter, client_ip(request))
+    # Only failures use up the account budget, so successful logins are free
+    account_key = f"{form_data.username.lower()}|{client_ip(request)}"
+    await enforce_rate_limit(login_account_limiter, account_key, cost=0)
     tutor = await authenticate_tutor(form_data.username, form_data.password)
     if not tutor:
+        await login_account_limiter.hit(account_key)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -156,113 +1444,171 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     return {"access_token": access_token, "token_type": "bearer"}
 
 # Tutor routes
-@api_router.post("/tutors", response_model=Tutor)
-async def create_tutor(tutor: TutorCreate):
+# Route dependencies run first, so a flood is rejected before claiming an idempotency key
+@api_router.post("/tutors", response_model=Tutor, dependencies=[Depends(limit_registrations)])
+async def create_tutor(tutor: TutorCreate, request: Request, idempotent: IdempotentCall = Depends(public_idempotency)):
+    if idempotent.replay is not None:
+        return idempotent.replay
     db_tutor = await get_tutor_by_email(tutor.email)
     if db_tutor:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # First tutor to register becomes admin automatically
-    tutor_count = await db.tutors.count_documents({})
+    is_first_tutor = await db.tutors.find_one({}, {"_id": 1}) is None
     
-    hashed_password = get_password_hash(tutor.password)
+    hashed_password = await get_password_hash_limited(tutor.password)
     tutor_dict = tutor.dict()
     tutor_dict.pop("password")
     
     # Set admin status - first tutor is always admin
-    if tutor_count == 0:
+    if is_first_tutor:
         tutor_dict["is_admin"] = True
     
     tutor_obj = Tutor(**tutor_dict)
-    tutor_dict = tutor_obj.dict()
+    tutor_dict = to_db(tutor_obj.dict())
     tutor_dict["password"] = hashed_password
     
     result = await db.tutors.insert_one(tutor_dict)
-    return tutor_obj
+    return await idempotent.save(tutor_obj)
 
 @api_router.get("/tutors/me", response_model=Tutor)
-async def read_tutors_me(current_tutor = Depends(get_current_tutor)):
+async def read_tutors_me(request: Request, response: Response, current_tutor = Depends(get_current_tutor)):
+    etag = make_etag("tutor", current_tutor["id"], current_tutor.get("version", 0))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
     return Tutor(**{k:v for k,v in current_tutor.items() if k != "password"})
 
 # Student routes
-@api_router.post("/students", response_model=Student)
-async def create_student(student: StudentCreate, current_tutor = Depends(get_current_tutor)):
+@api_router.post("/students", response_model=Student, dependencies=[Depends(limit_writes)])
+async def create_student(student: StudentCreate, current_tutor = Depends(get_current_tutor),
+                         idempotent: IdempotentCall = Depends(tutor_idempotency)):
+    if idempotent.replay is not None:
+        return idempotent.replay
     student_obj = Student(**student.dict(), tutor_id=current_tutor["id"])
-    result = await db.students.insert_one(student_obj.dict())
-    return student_obj
+    result = await db.students.insert_one({**to_db(student_obj.dict()), "version": 0})
+    student_owners.add(current_tutor["id"], db_id(student_obj.id))
+    await bump_tutor_version(current_tutor["id"], "students_version")
+    return await idempotent.save(student_obj)
 
 @api_router.get("/students", response_model=List[Student])
-async def read_students(current_tutor = Depends(get_current_tutor)):
-    students = await db.students.find({"tutor_id": current_tutor["id"]}).to_list(1000)
+async def read_students(request: Request, response: Response, current_tutor = Depends(get_current_tutor),
+                        session = Depends(causal_session)):
+    versions = await tutor_versions(current_tutor, session)
+    etag = make_etag("students", current_tutor["id"], versions.get("students_version", 0))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
+    students = await for_reads(db.students, session).find({"tutor_id": current_tutor["id"]}, session=session).to_list(1000)
     return [Student(**student) for student in students]
 
 @api_router.get("/students/{student_id}", response_model=Student)
-async def read_student(student_id: str, current_tutor = Depends(get_current_tutor)):
-    student = await db.students.find_one({"id": student_id, "tutor_id": current_tutor["id"]})
+async def read_student(student_id: str, request: Request, response: Response, current_tutor = Depends(get_current_tutor),
+                       session = Depends(causal_session)):
+    student = await for_reads(db.students, session).find_one(
+        {ID_KEY: db_id(student_id), "tutor_id": current_tutor["id"]}, session=session
+    )
     if student is None:
         raise HTTPException(status_code=404, detail="Student not found")
+    etag = make_etag("student", student_id, student.get("version", 0))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
     return Student(**student)
 
-@api_router.put("/students/{student_id}", response_model=Student)
+@api_router.put("/students/{student_id}", response_model=Student, dependencies=[Depends(limit_writes)])
 async def update_student(student_id: str, student: StudentCreate, current_tutor = Depends(get_current_tutor)):
-    existing = await db.students.find_one({"id": student_id, "tutor_id": current_tutor["id"]})
+    existing = await db.students.find_one({ID_KEY: db_id(student_id), "tutor_id": current_tutor["id"]})
     if existing is None:
         raise HTTPException(status_code=404, detail="Student not found")
     
     student_dict = student.dict()
-    await db.students.update_one(
-        {"id": student_id}, {"$set": student_dict}
+    updated = await db.students.find_one_and_update(
+        {ID_KEY: db_id(student_id), "tutor_id": current_tutor["id"]},
+        {"$set": student_dict, "$inc": {"version": 1}},
+        return_document=ReturnDocument.AFTER,
     )
-    updated = await db.students.find_one({"id": student_id})
+    await bump_tutor_version(current_tutor["id"], "students_version")
     return Student(**updated)
 
-@api_router.delete("/students/{student_id}", response_model=dict)
+@api_router.delete("/students/{student_id}", response_model=dict, dependencies=[Depends(limit_writes)])
 async def delete_student(student_id: str, current_tutor = Depends(get_current_tutor)):
-    existing = await db.students.find_one({"id": student_id, "tutor_id": current_tutor["id"]})
+    existing = await db.students.find_one({ID_KEY: db_id(student_id), "tutor_id": current_tutor["id"]})
     if existing is None:
         raise HTTPException(status_code=404, detail="Student not found")
     
-    await db.students.delete_one({"id": student_id})
+    await db.students.delete_one({ID_KEY: db_id(student_id), "tutor_id": current_tutor["id"]})
+    student_owners.discard(current_tutor["id"], db_id(student_id))
     # Also delete associated lessons
-    await db.lessons.delete_many({"student_id": student_id})
+    await lesson_store.delete_many(current_tutor["id"], student_id)
+    await db.lesson_rollups.delete_many({"tutor_id": current_tutor["id"], "student_id": db_id(student_id)})
+    await publish_lesson_event("purge", {"tutor_id": current_tutor["id"], "student_id": db_id(student_id)})
+    await bump_tutor_version(current_tutor["id"], "students_version", "lessons_version")
     return {"status": "success", "message": "Student deleted"}
 
-@api_router.put("/students/{student_id}/payment", response_model=Student)
+@api_router.put("/students/{student_id}/payment", response_model=Student, dependencies=[Depends(limit_writes)])
 async def update_payment_status(student_id: str, current_tutor = Depends(get_current_tutor)):
-    existing = await db.students.find_one({"id": student_id, "tutor_id": current_tutor["id"]})
+    existing = await db.students.find_one({ID_KEY: db_id(student_id), "tutor_id": current_tutor["id"]})
     if existing is None:
         raise HTTPException(status_code=404, detail="Student not found")
     
     new_status = not existing.get("payment_status", False)
     
-    await db.students.update_one(
-        {"id": student_id}, {"$set": {"payment_status": new_status}}
+    updated = await db.students.find_one_and_update(
+        {ID_KEY: db_id(student_id), "tutor_id": current_tutor["id"]},
+        {"$set": {"payment_status": new_status}, "$inc": {"version": 1}},
+        return_document=ReturnDocument.AFTER,
     )
-    updated = await db.students.find_one({"id": student_id})
+    await bump_tutor_version(current_tutor["id"], "students_version")
     return Student(**updated)
 
-@api_router.put("/students/{student_id}/homework", response_model=Student)
+@api_router.put("/students/{student_id}/homework", response_model=Student, dependencies=[Depends(limit_writes)])
 async def update_homework_status(student_id: str, current_tutor = Depends(get_current_tutor)):
-    existing = await db.students.find_one({"id": student_id, "tutor_id": current_tutor["id"]})
+    existing = await db.students.find_one({ID_KEY: db_id(student_id), "tutor_id": current_tutor["id"]})
     if existing is None:
         raise HTTPException(status_code=404, detail="Student not found")
     
     new_status = not existing.get("homework_status", False)
     
-    await db.students.update_one(
-        {"id": student_id}, {"$set": {"homework_status": new_status}}
+    updated = await db.students.find_one_and_update(
+        {ID_KEY: db_id(student_id), "tutor_id": current_tutor["id"]},
+        {"$set": {"homework_status": new_status}, "$inc": {"version": 1}},
+        return_document=ReturnDocument.AFTER,
     )
-    updated = await db.students.find_one({"id": student_id})
+    await bump_tutor_version(current_tutor["id"], "students_version")
     return Student(**updated)
 
-# Helper functions to check permissions
-async def get_admin_tutor(current_tutor = Depends(get_current_tutor)):
-    if not current_tutor.get("is_admin", False):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to perform this action",
+@api_router.patch("/students/status", response_model=List[StudentStatus], dependencies=[Depends(limit_writes)])
+async def update_student_statuses(batch: StudentStatusBatch, current_tutor = Depends(get_current_tutor)):
+    """Set (not toggle) payment/homework flags for many students in one write.
+
+    Students sharing the same target values are updated by a single
+    update_many; unknown or foreign ids are skipped and left out of the result.
+    """
+    targets = {}
+    for update in batch.updates:
+        values = update.dict(exclude={"id"}, exclude_none=True)
+        if not values:
+            raise HTTPException(status_code=400, detail=f"No status given for student {update.id}")
+        targets[update.id] = values  # a repeated id keeps its last entry
+    groups = {}
+    for student_id, values in targets.items():
+        groups.setdefault(tuple(sorted(values.items())), []).append(db_id(student_id))
+    operations = [
+        UpdateMany(
+            {ID_KEY: {"$in": ids}, "tutor_id": current_tutor["id"]},
+            {"$set": dict(values), "$inc": {"version": 1}},
         )
-    return current_tutor
+        for values, ids in groups.items()
+    ]
+    result = await db.students.bulk_write(operations, ordered=False)
+    if result.matched_count:
+        await bump_tutor_version(current_tutor["id"], "students_version")
+    cursor = db.students.find(
+        {ID_KEY: {"$in": [db_id(student_id) for student_id in targets]}, "tutor_id": current_tutor["id"]},
+        {ID_KEY: 1, "payment_status": 1, "homework_status": 1},
+    )
+    return [StudentStatus(**student) async for student in cursor]
 
 # Admin routes
 @api_router.get("/admin/tutors", response_model=List[Tutor])
@@ -272,34 +1618,31 @@ async def list_all_tutors(admin_tutor = Depends(get_admin_tutor)):
 
 @api_router.get("/admin/tutors/{tutor_id}", response_model=Tutor)
 async def get_tutor_by_id(tutor_id: str, admin_tutor = Depends(get_admin_tutor)):
-    tutor = await db.tutors.find_one({"id": tutor_id})
+    tutor = await db.tutors.find_one({ID_KEY: db_id(tutor_id)})
     if tutor is None:
         raise HTTPException(status_code=404, detail="Tutor not found")
     return Tutor(**{k:v for k,v in tutor.items() if k != "password"})
 
-@api_router.delete("/admin/tutors/{tutor_id}", response_model=dict)
+@api_router.delete("/admin/tutors/{tutor_id}", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
 async def delete_tutor(tutor_id: str, admin_tutor = Depends(get_admin_tutor)):
-    if tutor_id == admin_tutor["id"]:
+    if db_id(tutor_id) == admin_tutor["id"]:
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
     
-    tutor = await db.tutors.find_one({"id": tutor_id})
+    tutor = await db.tutors.find_one({ID_KEY: db_id(tutor_id)})
     if tutor is None:
         raise HTTPException(status_code=404, detail="Tutor not found")
 
-    await db.tutors.delete_one({"id": tutor_id})
-    
-    # Delete associated students and lessons
-    students = await db.students.find({"tutor_id": tutor_id}).to_list(1000)
-    student_ids = [student["id"] for student in students]
+    await db.tutors.delete_one({ID_KEY: db_id(tutor_id)})
+    student_owners.forget(doc_id(tutor))
     
-    await db.students.delete_many({"tutor_id": tutor_id})
-    await db.lessons.delete_many({"tutor_id": tutor_id})
+    # Students and lessons are deleted by a worker; until it runs they remain
+    job_id = await enqueue_job("delete_tutor_data", {"tutor_id": api_id(doc_id(tutor))})
     
-    return {"status": "success", "message": "Tutor and all associated data deleted"}
+    return {"status": "pending", "message": "Tutor deleted, removal of associated data is pending", "job_id": job_id}
 
 @api_router.put("/admin/tutors/{tutor_id}/admin", response_model=Tutor)
 async def toggle_admin_status(tutor_id: str, admin_tutor = Depends(get_admin_tutor)):
-    tutor = await db.tutors.find_one({"id": tutor_id})
+    tutor = await db.tutors.find_one({ID_KEY: db_id(tutor_id)})
     if tutor is None:
         raise HTTPException(status_code=404, detail="Tutor not found")
     
@@ -307,10 +1650,10 @@ async def toggle_admin_status(tutor_id: str, admin_tutor = Depends(get_admin_tut
     new_admin_status = not tutor.get("is_admin", False)
     
     await db.tutors.update_one(
-        {"id": tutor_id}, {"$set": {"is_admin": new_admin_status}}
+        {ID_KEY: db_id(tutor_id)}, {"$set": {"is_admin": new_admin_status}, "$inc": {"version": 1}}
     )
     
-    updated = await db.tutors.find_one({"id": tutor_id})
+    updated = await db.tutors.find_one({ID_KEY: db_id(tutor_id)})
     return Tutor(**{k:v for k,v in updated.items() if k != "password"})
 
 @api_router.get("/admin/students", response_model=List[Student])
@@ -318,19 +1661,45 @@ async def list_all_students(admin_tutor = Depends(get_admin_tutor)):
     students = await db.students.find().to_list(1000)
     return [Student(**student) for student in students]
 
-@api_router.get("/admin/lessons", response_model=List[Lesson])
-async def list_all_lessons(admin_tutor = Depends(get_admin_tutor)):
-    lessons = await db.lessons.find().to_list(1000)
-    return [Lesson(**lesson) for lesson in lessons]
+@api_router.get("/admin/lessons", response_model=List[ExpandedLesson])
+async def list_all_lessons(expand: Optional[str] = None, admin_tutor = Depends(get_admin_tutor)):
+    fields = parse_expand(expand)
+    lessons = await lesson_store.find({}, limit=1000)
+    return await expand_lessons(lessons, fields)
+
+@api_router.get("/admin/profiles", response_model=List[dict])
+async def list_profiles(admin_tutor = Depends(get_admin_tutor)):
+    if not PROFILE_DIR.exists():
+        return []
+    profiles = sorted(PROFILE_DIR.iterdir(), key=lambda path: path.stat().st_mtime, reverse=True)
+    return [
+        {"name": path.name, "size": path.stat().st_size, "created_at": datetime.utcfromtimestamp(path.stat().st_mtime)}
+        for path in profiles
+    ]
+
+@api_router.get("/admin/profiles/{name}")
+async def download_profile(name: str, admin_tutor = Depends(get_admin_tutor)):
+    path = PROFILE_DIR / name
+    if path.name != name or not path.is_file():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=name)
+
+@api_router.get("/admin/limits", response_model=dict)
+async def get_limit_metrics(admin_tutor = Depends(get_admin_tutor)):
+    return {
+        "counters": dict(limit_metrics),
+        "bcrypt_waiting": bcrypt_limiter.waiting,
+        "bcrypt_max_waiting": bcrypt_limiter.max_waiting,
+    }
 
 @api_router.get("/admin/stats", response_model=dict)
 async def get_system_stats(admin_tutor = Depends(get_admin_tutor)):
     tutor_count = await db.tutors.count_documents({})
     student_count = await db.students.count_documents({})
-    lesson_count = await db.lessons.count_documents({})
+    lesson_count = await lesson_store.count()
     
     # Get lesson count by month
-    lessons = await db.lessons.find().to_list(1000)
+    lessons = await lesson_store.find({}, limit=1000)
     lessons_by_month = {}
     
     for lesson in lessons:
@@ -349,56 +1718,625 @@ async def get_system_stats(admin_tutor = Depends(get_admin_tutor)):
         "lesson_count": lesson_count,
         "lessons_by_month": lessons_by_month
     }
-@api_router.post("/lessons", response_model=Lesson)
-async def create_lesson(lesson: LessonCreate, current_tutor = Depends(get_current_tutor)):
+@api_router.post("/lessons", response_model=Lesson, dependencies=[Depends(limit_writes)])
+async def create_lesson(lesson: LessonCreate, current_tutor = Depends(get_current_tutor),
+                        idempotent: IdempotentCall = Depends(tutor_idempotency)):
+    if idempotent.replay is not None:
+        return idempotent.replay
     # Verify student belongs to tutor
-    student = await db.students.find_one({"id": lesson.student_id, "tutor_id": current_tutor["id"]})
-    if student is None:
+    if not await student_owners.owns(current_tutor["id"], lesson.student_id):
         raise HTTPException(status_code=404, detail="Student not found")
     
     lesson_obj = Lesson(**lesson.dict(), tutor_id=current_tutor["id"])
-    result = await db.lessons.insert_one(lesson_obj.dict())
-    return lesson_obj
+    await lesson_store.insert(lesson_obj.dict())
+    await bump_tutor_version(current_tutor["id"], "lessons_version")
+    await apply_lesson_to_rollup(lesson_obj.dict(), 1)
+    await publish_lesson_event("upsert", lesson_obj.dict())
+    return await idempotent.save(lesson_obj)
 
-@api_router.get("/lessons", response_model=List[Lesson])
-async def read_lessons(current_tutor = Depends(get_current_tutor)):
-    lessons = await db.lessons.find({"tutor_id": current_tutor["id"]}).to_list(1000)
-    return [Lesson(**lesson) for lesson in lessons]
+@api_router.get("/lessons", response_model=List[ExpandedLesson])
+async def read_lessons(request: Request, response: Response, expand: Optional[str] = None,
+                       current_tutor = Depends(get_current_tutor), session = Depends(causal_session)):
+    fields = parse_expand(expand)
+    tutor = await tutor_versions(current_tutor, session)
+    # Expanded students can change without a lesson write
+    versions = [tutor.get("lessons_version", 0)]
+    if "student" in fields:
+        versions.append(tutor.get("students_version", 0))
+    if "tutor" in fields:
+        versions.append(tutor.get("version", 0))
+    etag = make_etag("lessons", current_tutor["id"], ",".join(sorted(fields)), *versions)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
+    lessons = await lesson_store.find({"tutor_id": current_tutor["id"]}, limit=1000, session=session)
+    return await expand_lessons(lessons, fields, current_tutor["id"])
 
 @api_router.get("/lessons/{lesson_id}", response_model=Lesson)
-async def read_lesson(lesson_id: str, current_tutor = Depends(get_current_tutor)):
-    lesson = await db.lessons.find_one({"id": lesson_id, "tutor_id": current_tutor["id"]})
+async def read_lesson(lesson_id: str, request: Request, response: Response, current_tutor = Depends(get_current_tutor),
+                      session = Depends(causal_session)):
+    lesson = await lesson_store.find_one(current_tutor["id"], lesson_id, session=session)
     if lesson is None:
         raise HTTPException(status_code=404, detail="Lesson not found")
+    etag = make_etag("lesson", lesson_id, lesson.get("version", 0))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
     return Lesson(**lesson)
 
-@api_router.put("/lessons/{lesson_id}", response_model=Lesson)
+@api_router.put("/lessons/{lesson_id}", response_model=Lesson, dependencies=[Depends(limit_writes)])
 async def update_lesson(lesson_id: str, lesson: LessonCreate, current_tutor = Depends(get_current_tutor)):
-    existing = await db.lessons.find_one({"id": lesson_id, "tutor_id": current_tutor["id"]})
-    if existing is None:
-        raise HTTPException(status_code=404, detail="Lesson not found")
-    
     # Verify student belongs to tutor
-    student = await db.students.find_one({"id": lesson.student_id, "tutor_id": current_tutor["id"]})
-    if student is None:
+    if not await student_owners.owns(current_tutor["id"], lesson.student_id):
         raise HTTPException(status_code=404, detail="Student not found")
     
     lesson_dict = lesson.dict()
-    await db.lessons.update_one(
-        {"id": lesson_id}, {"$set": lesson_dict}
-    )
-    updated = await db.lessons.find_one({"id": lesson_id})
+    # Rollups are adjusted by the pre-image the write itself replaced, so
+    # concurrent updates never subtract the same version twice
+    result = await lesson_store.update(current_tutor["id"], lesson_id, lesson_dict)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    existing, updated = result
+    await bump_tutor_version(current_tutor["id"], "lessons_version")
+    await apply_lesson_to_rollup(existing, -1)
+    await apply_lesson_to_rollup(updated, 1)
+    await publish_lesson_event("upsert", updated)
     return Lesson(**updated)
 
-@api_router.delete("/lessons/{lesson_id}", response_model=dict)
+@api_router.delete("/lessons/{lesson_id}", response_model=dict, dependencies=[Depends(limit_writes)])
 async def delete_lesson(lesson_id: str, current_tutor = Depends(get_current_tutor)):
-    existing = await db.lessons.find_one({"id": lesson_id, "tutor_id": current_tutor["id"]})
+    existing = await lesson_store.delete(current_tutor["id"], lesson_id)
     if existing is None:
         raise HTTPException(status_code=404, detail="Lesson not found")
     
-    await db.lessons.delete_one({"id": lesson_id})
+    await bump_tutor_version(current_tutor["id"], "lessons_version")
+    await apply_lesson_to_rollup(existing, -1)
+    await publish_lesson_event("delete", existing)
     return {"status": "success", "message": "Lesson deleted"}
 
+# Lesson change events
+# Lesson writes append to the capped lesson_events collection, which
+# scheduler.py tails. Capped collections support tailable cursors on a
+# standalone server, unlike change streams.
+async def publish_lesson_event(op: Literal["upsert", "delete", "purge"], lesson: dict):
+    event = {"op": op, "at": datetime.utcnow()}
+    for field in ("id", "tutor_id", "student_id", "start_time"):
+        if field in lesson:
+            event[field] = db_id(lesson[field])
+    if op != "purge" and "id" not in lesson:
+        event["id"] = lesson["_id"]
+    await db.lesson_events.insert_one(event)
+
+async def ensure_lesson_events():
+    if "lesson_events" not in await db.list_collection_names():
+        try:
+            await db.create_collection("lesson_events", capped=True, size=LESSON_EVENTS_BYTES)
+            # A tailable cursor on an empty capped collection dies immediately
+            await db.lesson_events.insert_one({"op": "noop", "at": datetime.utcnow()})
+        except CollectionInvalid:
+            pass
+
+# Reporting
+# lesson_rollups holds one document per (tutor, student, subject, day) with
+# the lesson count and minutes taught. Lesson writes adjust it in place, and
+# reports re-bucket the daily rows with $dateTrunc, so a multi-year report
+# reads at most one row per student-subject-day.
+ROLLUP_KEY = ["tutor_id", "day", "student_id", "subject"]
+
+async def apply_lesson_to_rollup(lesson: dict, sign: int):
+    start_time = as_datetime(lesson["start_time"])
+    end_time = as_datetime(lesson["end_time"])
+    minutes = (end_time - start_time).total_seconds() / 60
+    await db.lesson_rollups.update_one(
+        {
+            "tutor_id": db_id(lesson["tutor_id"]),
+            "day": datetime(start_time.year, start_time.month, start_time.day),
+            "student_id": db_id(lesson["student_id"]),
+            "subject": lesson["subject"],
+        },
+        {"$inc": {"lesson_count": sign, "minutes": sign * minutes}},
+        upsert=True,
+    )
+
+async def rebuild_rollups(tutor_id: Optional[str] = None):
+    """Recompute rollups from the lessons collection, e.g. after a backfill."""
+    match = {"tutor_id": db_id(tutor_id)} if tutor_id else {}
+    await db.lesson_rollups.delete_many(match)
+    await lesson_store.collection.aggregate([
+        *lesson_store.flat_stages(match),
+        {"$group": {
+            "_id": {
+                "tutor_id": "$tutor_id",
+                "student_id": "$student_id",
+                "subject": "$subject",
+                "day": {"$dateTrunc": {"date": "$start_time", "unit": "day"}},
+            },
+            "lesson_count": {"$sum": 1},
+            "minutes": {"$sum": {"$divide": [{"$subtract": ["$end_time", "$start_time"]}, 60000]}},
+        }},
+        {"$project": {
+            "_id": 0,
+            "tutor_id": "$_id.tutor_id",
+            "student_id": "$_id.student_id",
+            "subject": "$_id.subject",
+            "day": "$_id.day",
+            "lesson_count": 1,
+            "minutes": 1,
+        }},
+        {"$merge": {"into": "lesson_rollups", "on": ROLLUP_KEY, "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]).to_list(None)
+
+@api_router.get("/reports/lessons", response_model=List[ReportRow])
+async def lesson_report(
+    period: Literal["day", "week", "month"] = "month",
+    group_by: Literal["none", "student", "subject", "tutor"] = "none",
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    scope: Literal["own", "all"] = "own",
+    current_tutor = Depends(get_current_tutor),
+):
+    if (scope == "all" or group_by == "tutor") and not current_tutor.get("is_admin", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to perform this action",
+        )
+    match = {} if scope == "all" else {"tutor_id": current_tutor["id"]}
+    if start or end:
+        match["day"] = {}
+        if start:
+            match["day"]["$gte"] = start
+        if end:
+            match["day"]["$lt"] = end
+
+    group_id = {"period": {"$dateTrunc": {"date": "$day", "unit": period, "startOfWeek": "monday"}}}
+    if group_by != "none":
+        group_id["key"] = f"${group_by}_id" if group_by in ("student", "tutor") else "$subject"
+    rows = await db.lesson_rollups.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": group_id,
+            "lesson_count": {"$sum": "$lesson_count"},
+            "minutes": {"$sum": "$minutes"},
+        }},
+        {"$match": {"lesson_count": {"$gt": 0}}},
+        {"$sort": {"_id.period": 1, "_id.key": 1}},
+    ]).to_list(None)
+
+    payment_status = {}
+    if group_by == "student":
+        student_ids = list({row["_id"]["key"] for row in rows})
+        student_filter = {**match, ID_KEY: {"$in": student_ids}}
+        student_filter.pop("day", None)
+        async for student in db.students.find(student_filter, {ID_KEY: 1, "payment_status": 1}):
+            payment_status[doc_id(student)] = student.get("payment_status", False)
+
+    return [
+        ReportRow(
+            period=row["_id"]["period"],
+            key=row["_id"].get("key"),
+            lesson_count=row["lesson_count"],
+            hours=round(row["minutes"] / 60, 2),
+            payment_status=payment_status.get(row["_id"].get("key")),
+        )
+        for row in rows
+    ]
+
+@api_router.post("/admin/reports/rebuild", response_model=dict)
+async def rebuild_reports(tutor_id: Optional[str] = None, admin_tutor = Depends(get_admin_tutor)):
+    await rebuild_rollups(tutor_id)
+    return {"status": "success", "message": "Report rollups rebuilt"}
+
+# Availability
+def parse_clock(value: str) -> dt_time:
+    try:
+        return dt_time.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid time of day: {value}")
+
+def parse_hours(value: str):
+    """Parse "HH:MM-HH:MM" into (opens, closes)."""
+    opens, separator, closes = value.partition("-")
+    if not separator:
+        raise HTTPException(status_code=400, detail=f"Invalid working hours: {value}")
+    return parse_clock(opens), parse_clock(closes)
+
+def parse_weekdays(value: str) -> set:
+    """Parse comma-separated weekday numbers, Monday being 0."""
+    try:
+        days = {int(day) for day in value.split(",") if day.strip()}
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid weekdays: {value}")
+    if not days <= set(range(7)):
+        raise HTTPException(status_code=400, detail=f"Weekdays must be between 0 and 6: {value}")
+    return days
+
+def working_windows(start: datetime, end: datetime, day_start: dt_time, day_end: dt_time,
+                    weekdays: set, tz: ZoneInfo):
+    """Working intervals between start and end as naive UTC datetimes."""
+    local_day = start.replace(tzinfo=timezone.utc).astimezone(tz).date()
+    last_day = end.replace(tzinfo=timezone.utc).astimezone(tz).date()
+    windows = []
+    while local_day <= last_day:
+        if local_day.weekday() in weekdays:
+            opens = datetime.combine(local_day, day_start, tz).astimezone(timezone.utc).replace(tzinfo=None)
+            closes = datetime.combine(local_day, day_end, tz).astimezone(timezone.utc).replace(tzinfo=None)
+            opens, closes = max(opens, start), min(closes, end)
+            if opens < closes:
+                windows.append((opens, closes))
+        local_day += timedelta(days=1)
+    return windows
+
+def merge_intervals(intervals):
+    """Merge start-sorted intervals into disjoint ones."""
+    merged = []
+    for begins, ends in intervals:
+        if merged and begins <= merged[-1][1]:
+            if ends > merged[-1][1]:
+                merged[-1][1] = ends
+        else:
+            merged.append([begins, ends])
+    return merged
+
+def free_slots(windows, busy, duration: timedelta):
+    """Subtract merged busy intervals from sorted windows in a single sweep."""
+    slots = []
+    i = 0
+    for opens, closes in windows:
+        while i < len(busy) and busy[i][1] <= opens:
+            i += 1
+        cursor = opens
+        j = i
+        while j < len(busy) and busy[j][0] < closes:
+            if busy[j][0] - cursor >= duration:
+                slots.append((cursor, busy[j][0]))
+            cursor = max(cursor, busy[j][1])
+            j += 1
+        if closes - cursor >= duration:
+            slots.append((cursor, closes))
+    return slots
+
+async def busy_intervals(tutor_id: str, start: datetime, end: datetime):
+    lessons = await lesson_store.find(
+        {
+            "tutor_id": tutor_id,
+            "start_time": {"$gte": start - timedelta(hours=MAX_LESSON_HOURS), "$lt": end},
+            "end_time": {"$gt": start},
+        },
+        {"_id": 0, "start_time": 1, "end_time": 1},
+        sort=[("start_time", 1)],
+    )
+    return merge_intervals((lesson["start_time"], lesson["end_time"]) for lesson in lessons)
+
+async def compute_free_slots(tutor_id: str, start: datetime, end: datetime, duration: timedelta,
+                             day_start: Optional[str], day_end: Optional[str],
+                             weekdays: Optional[str], tz_name: str):
+    # Work in naive UTC like the stored lessons
+    try:
+        start, end = naive_utc(start), naive_utc(end)
+    except OverflowError:
+        raise HTTPException(status_code=400, detail="'from' or 'to' is out of range")
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+    # working_windows walks the range day by day on the event loop
+    if end - start > timedelta(days=MAX_AVAILABILITY_DAYS):
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {MAX_AVAILABILITY_DAYS} days")
+    try:
+        tz = ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown timezone: {tz_name}")
+    default_start, default_end = parse_hours(WORKING_HOURS)
+    days = parse_weekdays(weekdays or WORKING_DAYS)
+    windows = working_windows(
+        start, end, parse_clock(day_start) if day_start else default_start,
+        parse_clock(day_end) if day_end else default_end, days, tz,
+    )
+    busy = await busy_intervals(tutor_id, start, end)
+    return free_slots(windows, busy, duration)
+
+def place_lessons(slots, requests, tz: ZoneInfo):
+    """Place requests into [start, end] slots of naive UTC, longest first.
+
+    Slots are consumed in place. A student gets at most one lesson per day
+    in tz, which for offset timezones is not the UTC date.
+    """
+    placed, unplaced = [], []
+    booked_days = set()
+    for request in sorted(requests, key=lambda r: r.duration_minutes, reverse=True):
+        length = timedelta(minutes=request.duration_minutes)
+        remaining = request.count
+        for slot in slots:
+            while remaining and slot[1] - slot[0] >= length:
+                day = slot[0].replace(tzinfo=timezone.utc).astimezone(tz).date()
+                if (request.student_id, day) in booked_days:
+                    break
+                placed.append(PlannedLesson(student_id=request.student_id, start_time=slot[0], end_time=slot[0] + length))
+                booked_days.add((request.student_id, day))
+                slot[0] += length
+                remaining -= 1
+            if not remaining:
+                break
+        if remaining:
+            unplaced.append(LessonRequest(
+                student_id=request.student_id, duration_minutes=request.duration_minutes, count=remaining
+            ))
+    placed.sort(key=lambda lesson: lesson.start_time)
+    return placed, unplaced
+
+@api_router.get("/availability", response_model=List[Slot])
+async def read_availability(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    duration: int = Query(60, gt=0, description="Minimum slot length in minutes"),
+    day_start: Optional[str] = None,
+    day_end: Optional[str] = None,
+    weekdays: Optional[str] = None,
+    tz: str = Query("UTC", alias="timezone"),
+    current_tutor = Depends(get_current_tutor),
+):
+    slots = await compute_free_slots(
+        current_tutor["id"], start, end, timedelta(minutes=duration), day_start, day_end, weekdays, tz
+    )
+    return [Slot(start_time=begins, end_time=ends) for begins, ends in slots]
+
+@api_router.post("/availability/plan", response_model=Plan)
+async def plan_lessons(plan: PlanCreate, current_tutor = Depends(get_current_tutor)):
+    """Greedily place requested lessons into free slots without saving them.
+
+    Longest lessons are placed first, each into the earliest slot that fits,
+    and a student gets at most one lesson per day in the plan's timezone.
+    """
+    student_ids = list({request.student_id for request in plan.requests})
+    owned = await db.students.count_documents({ID_KEY: {"$in": [db_id(id_) for id_ in student_ids]}, "tutor_id": current_tutor["id"]})
+    if owned != len(student_ids):
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    shortest = min((request.duration_minutes for request in plan.requests), default=1)
+    slots = [list(slot) for slot in await compute_free_slots(
+        current_tutor["id"], plan.start, plan.end, timedelta(minutes=shortest),
+        plan.day_start, plan.day_end, plan.weekdays, plan.timezone,
+    )]
+
+    placed, unplaced = place_lessons(slots, plan.requests, ZoneInfo(plan.timezone))
+    return Plan(placed=placed, unplaced=unplaced)
+
+# Search routes
+@api_router.get("/search", response_model=SearchResults)
+async def search(
+    q: str,
+    limit: int = 20,
+    skip: int = 0,
+    scope: Literal["own", "all"] = "own",
+    current_tutor = Depends(get_current_tutor),
+):
+    q = q.strip()
+    if not q:
+        raise HTTPException(status_code=400, detail="Query must not be empty")
+    if scope == "all" and not current_tutor.get("is_admin", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to perform this action",
+        )
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    skip = max(0, skip)
+
+    base_filter = {} if scope == "all" else {"tutor_id": current_tutor["id"]}
+    # Each collection can contribute at most skip + limit + 1 results to the page
+    fetch = skip + limit + 1
+    student_hits = await search_collection(db.students, base_filter, q, "name", ("name", "notes"), fetch)
+    lesson_hits = await lesson_store.search(base_filter, q, fetch)
+
+    results = [
+        SearchResult(type="student", id=doc_id(doc), score=score, student=Student(**doc))
+        for score, doc in student_hits
+    ] + [
+        SearchResult(type="lesson", id=doc_id(doc), score=score, lesson=Lesson(**doc))
+        for score, doc in lesson_hits
+    ]
+    results.sort(key=lambda result: (-result.score, result.type, result.id))
+    return SearchResults(
+        query=q,
+        skip=skip,
+        limit=limit,
+        has_more=len(results) > skip + limit,
+        results=results[skip:skip + limit],
+    )
+
+# Background jobs
+# Jobs are persisted in db.jobs and executed by worker.py, which can be
+# scaled independently of the API. A job is claimed by atomically setting a
+# lease; if the worker dies the lease expires and another worker picks it
+# up. The lease is renewed while the job runs, and an expired lease counts
+# as an attempt. Failures are retried in-process for transient errors, then
+# rescheduled with exponential backoff until max_attempts. Result files go to
+# GridFS so any API process can serve them, wherever the worker ran.
+job_handlers = {}
+job_files = AsyncIOMotorGridFSBucket(db, bucket_name="job_results")
+
+class TransientJobError(Exception):
+    """Raised by handlers for failures worth an immediate in-process retry."""
+
+def job_handler(name: str):
+    def register(func):
+        job_handlers[name] = func
+        return func
+    return register
+
+async def enqueue_job(name: str, payload: dict, run_at: Optional[datetime] = None,
+                      tutor_id=None, max_attempts: int = JOB_MAX_ATTEMPTS,
+                      repeat_seconds: Optional[int] = None) -> str:
+    now = datetime.utcnow()
+    result = await db.jobs.insert_one({
+        "name": name,
+        "payload": payload,
+        "tutor_id": tutor_id,
+        "status": "queued",
+        "run_at": run_at or now,
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "repeat_seconds": repeat_seconds,
+        "locked_until": None,
+        "created_at": now,
+        "updated_at": now,
+    })
+    return str(result.inserted_id)
+
+async def claim_job(worker_id: str):
+    """Take the next due job, or one whose lease has expired."""
+    now = datetime.utcnow()
+    # A job that keeps killing its worker must not be reclaimed forever
+    await db.jobs.update_many(
+        {"status": "running", "locked_until": {"$lt": now}, "$expr": {"$gte": ["$attempts", "$max_attempts"]}},
+        {"$set": {
+            "status": "failed",
+            "last_error": "Lease expired on the final attempt",
+            "locked_until": None,
+            "updated_at": now,
+        }},
+    )
+    return await db.jobs.find_one_and_update(
+        {"$or": [
+            {"status": "queued", "run_at": {"$lte": now}},
+            {"status": "running", "locked_until": {"$lt": now}},
+        ]},
+        {"$set": {
+            "status": "running",
+            "worker": worker_id,
+            "locked_until": now + timedelta(seconds=JOB_LEASE_SECONDS),
+            "updated_at": now,
+        }, "$inc": {"attempts": 1}},
+        sort=[("run_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+async def renew_lease(job: dict):
+    """Extend the job's lease every third of JOB_LEASE_SECONDS while it runs."""
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        renewed = await db.jobs.update_one(
+            {"_id": job["_id"], "status": "running", "worker": job["worker"]},
+            {"$set": {"locked_until": datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)}},
+        )
+        if not renewed.matched_count:
+            logger.warning("job lease lost", extra={"event": "job_lease_lost", "job_id": str(job["_id"])})
+            return
+
+async def run_job(job: dict):
+    handler = job_handlers.get(job["name"])
+    now = datetime.utcnow()
+    # Status updates only apply while this worker still holds the lease
+    owned = {"_id": job["_id"], "worker": job["worker"]}
+    renewal = asyncio.create_task(renew_lease(job))
+    try:
+        if handler is None:
+            raise ValueError(f"No handler for job {job['name']}")
+        async for attempt in AsyncRetrying(
+            retry=retry_if_exception_type(TransientJobError),
+            stop=stop_after_attempt(3),
+            wait=wait_exponential(multiplier=0.5, max=10),
+            reraise=True,
+        ):
+            with attempt:
+                result = await handler(**job["payload"])
+    except Exception as exc:
+        renewal.cancel()
+        failed = job["attempts"] >= job["max_attempts"]
+        backoff = timedelta(seconds=min(3600, 2 ** job["attempts"] * 10))
+        await db.jobs.update_one(owned, {"$set": {
+            "status": "failed" if failed else "queued",
+            "run_at": now + backoff,
+            "last_error": f"{type(exc).__name__}: {exc}",
+            "locked_until": None,
+            "updated_at": datetime.utcnow(),
+        }})
+        logger.warning("job failed", extra={
+            "event": "job_failed", "job_id": str(job["_id"]), "job": job["name"],
+            "attempts": job["attempts"], "final": failed, "error": str(exc),
+        })
+        return
+    renewal.cancel()
+    await db.jobs.update_one(owned, {"$set": {
+        "status": "done",
+        "result": result,
+        "locked_until": None,
+        "updated_at": datetime.utcnow(),
+    }})
+    if job.get("repeat_seconds"):
+        await enqueue_job(
+            job["name"], job["payload"], run_at=job["run_at"] + timedelta(seconds=job["repeat_seconds"]),
+            tutor_id=job.get("tutor_id"), max_attempts=job["max_attempts"], repeat_seconds=job["repeat_seconds"],
+        )
+
+@job_handler("delete_tutor_data")
+async def delete_tutor_data(tutor_id: str):
+    deleted = await db.students.delete_many({"tutor_id": db_id(tutor_id)})
+    await lesson_store.delete_many(tutor_id)
+    await db.lesson_rollups.delete_many({"tutor_id": db_id(tutor_id)})
+    await publish_lesson_event("purge", {"tutor_id": db_id(tutor_id)})
+    return {"students_deleted": deleted.deleted_count}
+
+LESSON_CSV_FIELDS = ["id", "title", "subject", "student_id", "start_time", "end_time", "notes"]
+
+@job_handler("export_lessons_csv")
+async def export_lessons_csv(tutor_id: str, job_name: str):
+    filename = f"{job_name}.csv"
+    lessons = await lesson_store.find({"tutor_id": db_id(tutor_id)}, sort=[("start_time", 1)])
+    upload = job_files.open_upload_stream(filename, metadata={"tutor_id": tutor_id, "content_type": "text/csv"})
+    try:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=LESSON_CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for row, lesson in enumerate(lessons, 1):
+            writer.writerow(Lesson(**lesson).dict())
+            if row % 1000 == 0:
+                await upload.write(buffer.getvalue().encode())
+                buffer.seek(0)
+                buffer.truncate()
+        await upload.write(buffer.getvalue().encode())
+        await upload.close()
+    except BaseException:
+        await upload.abort()
+        raise
+    return {"file_id": str(upload._id), "filename": filename, "rows": len(lessons)}
+
+async def get_job_for_tutor(job_id: str, current_tutor: dict) -> dict:
+    try:
+        job = await db.jobs.find_one({"_id": ObjectId(job_id)})
+    except InvalidId:
+        job = None
+    if job is None or (job.get("tutor_id") != api_id(current_tutor["id"]) and not current_tutor.get("is_admin", False)):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@api_router.post("/reports/lessons/export", response_model=Job, status_code=status.HTTP_202_ACCEPTED)
+async def export_lessons(current_tutor = Depends(get_current_tutor)):
+    tutor_id = api_id(current_tutor["id"])
+    job_name = f"lessons-{tutor_id}-{uuid.uuid4().hex[:8]}"
+    job_id = await enqueue_job("export_lessons_csv", {"tutor_id": tutor_id, "job_name": job_name}, tutor_id=tutor_id)
+    return await read_job(job_id, current_tutor)
+
+@api_router.get("/jobs/{job_id}", response_model=Job)
+async def read_job(job_id: str, current_tutor = Depends(get_current_tutor)):
+    job = await get_job_for_tutor(job_id, current_tutor)
+    return Job(id=str(job["_id"]), **{k: v for k, v in job.items() if k != "_id"})
+
+@api_router.get("/jobs/{job_id}/download")
+async def download_job_result(job_id: str, current_tutor = Depends(get_current_tutor)):
+    job = await get_job_for_tutor(job_id, current_tutor)
+    result = job.get("result") or {}
+    if job["status"] != "done" or not result.get("file_id"):
+        raise HTTPException(status_code=409, detail="Job has no result yet")
+    download = await job_files.open_download_stream(ObjectId(result["file_id"]))
+
+    async def chunks():
+        while chunk := await download.readchunk():
+            yield chunk
+
+    return StreamingResponse(
+        chunks(),
+        media_type=(download.metadata or {}).get("content_type", "application/octet-stream"),
+        headers={"Content-Disposition": f'attachment; filename="{download.filename}"'},
+    )
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -408,14 +2346,38 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[SESSION_TOKEN_HEADER],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+if GZIP_MINIMUM_SIZE > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_LEVEL)
+
+@app.on_event("startup")
+async def start_query_monitoring():
+    slow_query_listener.loop = asyncio.get_running_loop()
+
+@app.on_event("startup")
+async def create_indexes():
+    if not BINARY_IDS:
+        # Binary ids live in _id, which is always indexed
+        await db.tutors.create_index("id", unique=True)
+    # Doubles as the shard key index, see SHARD_KEYS
+    await db.students.create_index(SHARD_KEYS["students"], unique=True)
+    if LESSON_STORAGE != "buckets":
+        await db.lessons.create_index(SHARD_KEYS["lessons"], unique=True)
+    await db.tutors.create_index("email", unique=True)
+    await db.students.create_index([("tutor_id", 1), ("name", 1)])
+    await drop_index_if_exists(db.students, "students_text")
+    await db.students.create_index(
+        [("tutor_id", 1), ("name", "text"), ("notes", "text")],
+        weights={"name": 5, "notes": 1},
+        name="students_tutor_text",
+    )
+    await lesson_store.create_indexes()
+    await db.lesson_rollups.create_index(ROLLUP_KEY, unique=True)
+    await db.jobs.create_index([("status", 1), ("run_at", 1)])
+    await db.idempotency_keys.create_index("created_at", expireAfterSeconds=IDEMPOTENCY_TTL_SECONDS)
+    await ensure_lesson_events()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
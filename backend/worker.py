@@ -0,0 +1,68 @@
+"""Background job worker.
+
+Runs jobs enqueued through server.enqueue_job. Start as many worker
+processes as needed, independently of the API:
+    python worker.py [--concurrency 4] [--poll-interval 1.0]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+
+import server
+
+logger = server.logger
+
+
+MAX_ERROR_BACKOFF = 30.0
+
+
+async def idle(stopping: asyncio.Event, seconds: float):
+    try:
+        await asyncio.wait_for(stopping.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def work(worker_id: str, poll_interval: float, stopping: asyncio.Event):
+    errors = 0
+    while not stopping.is_set():
+        try:
+            job = await server.claim_job(worker_id)
+            if job is not None:
+                await server.run_job(job)
+            errors = 0
+        except Exception:
+            # e.g. Mongo unreachable; a lease we could not release expires on its own
+            errors += 1
+            backoff = min(MAX_ERROR_BACKOFF, poll_interval * 2 ** errors)
+            logger.exception("worker loop failed", extra={"event": "worker_error", "worker": worker_id, "backoff": backoff})
+            await idle(stopping, backoff)
+            continue
+        if job is None:
+            await idle(stopping, poll_interval)
+
+
+async def main(concurrency: int, poll_interval: float):
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    await server.create_indexes()
+    base_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info("worker started", extra={"event": "worker_started", "worker": base_id, "concurrency": concurrency})
+    # Jobs in flight finish before exit; unfinished leases are reclaimed by other workers
+    await asyncio.gather(*(
+        work(f"{base_id}:{slot}", poll_interval, stopping) for slot in range(concurrency)
+    ))
+    server.client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=int(os.environ.get("WORKER_CONCURRENCY", "4")))
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.poll_interval))
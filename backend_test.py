@@ -3,6 +3,7 @@ import sys
 import uuid
 from datetime import datetime, timedelta
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 class TutorAppTester:
     def __init__(self, base_url):
@@ -16,13 +17,16 @@ class TutorAppTester:
         self.student_id = None
         self.lesson_id = None
         self.is_admin = False
+        self.last_response = None
 
-    def run_test(self, name, method, endpoint, expected_status, data=None, params=None):
+    def run_test(self, name, method, endpoint, expected_status, data=None, params=None, extra_headers=None):
         """Run a single API test"""
         url = f"{self.base_url}/api/{endpoint}"
         headers = {'Content-Type': 'application/json'}
         if self.token:
             headers['Authorization'] = f'Bearer {self.token}'
+        if extra_headers:
+            headers.update(extra_headers)
 
         self.tests_run += 1
         print(f"\n🔍 Testing {name}...")
@@ -34,8 +38,11 @@ class TutorAppTester:
                 response = requests.post(url, json=data, headers=headers, params=params)
             elif method == 'PUT':
                 response = requests.put(url, json=data, headers=headers, params=params)
+            elif method == 'PATCH':
+                response = requests.patch(url, json=data, headers=headers, params=params)
             elif method == 'DELETE':
                 response = requests.delete(url, headers=headers, params=params)
+            self.last_response = response
             
             success = response.status_code == expected_status
             if success:
@@ -132,6 +139,34 @@ class TutorAppTester:
             self.student_id = response['id']
         return success
 
+    def test_idempotent_create_student(self, retries=5):
+        """Test that parallel retries with one Idempotency-Key create a single student"""
+        self.tests_run += 1
+        print("\n🔍 Testing Idempotent student creation with parallel retries...")
+        url = f"{self.base_url}/api/students"
+        headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self.token}',
+            'Idempotency-Key': uuid.uuid4().hex,
+        }
+        data = {"name": "Idempotent Student", "notes": "Created once", "lesson_link": ""}
+        try:
+            with ThreadPoolExecutor(max_workers=retries) as pool:
+                responses = list(pool.map(lambda _: requests.post(url, json=data, headers=headers), range(retries)))
+        except Exception as e:
+            print(f"❌ Failed - Error: {str(e)}")
+            return False
+        statuses = [response.status_code for response in responses]
+        ids = {response.json().get('id') for response in responses if response.status_code == 200}
+        replayed = sum(response.headers.get('Idempotent-Replayed') == 'true' for response in responses)
+        if statuses != [200] * retries or len(ids) != 1 or replayed != retries - 1:
+            print(f"❌ Failed - Statuses {statuses}, ids {ids}, replayed {replayed}")
+            return False
+        self.tests_passed += 1
+        print(f"✅ Passed - {retries} attempts, one student, {replayed} replayed")
+        requests.delete(f"{url}/{ids.pop()}", headers=headers)
+        return True
+
     def test_get_students(self):
         """Test getting all students"""
         success, response = self.run_test(
@@ -142,6 +177,115 @@ class TutorAppTester:
         )
         return success
 
+    def test_conditional_get(self, endpoint):
+        """Test that a matching If-None-Match returns 304 without a body"""
+        success, response = self.run_test(
+            f"Fetch ETag for {endpoint}",
+            "GET",
+            endpoint,
+            200
+        )
+        etag = self.last_response.headers.get('ETag') if success else None
+        if not etag:
+            print("❌ No ETag header returned")
+            return False
+
+        success, response = self.run_test(
+            f"Conditional GET for {endpoint}",
+            "GET",
+            endpoint,
+            304,
+            extra_headers={'If-None-Match': etag}
+        )
+        return success and not self.last_response.content
+
+    def test_search(self):
+        """Test searching students and lessons by prefix"""
+        success, response = self.run_test(
+            "Search students and lessons",
+            "GET",
+            "search",
+            200,
+            params={"q": "Updated Test", "limit": 10}
+        )
+        if success:
+            found_ids = [result['id'] for result in response.get('results', [])]
+            print(f"Found {len(found_ids)} results")
+            if self.student_id and self.student_id not in found_ids:
+                print("❌ Created student missing from search results")
+                return False
+        return success
+
+    def test_lesson_report(self):
+        """Test monthly per-student teaching report"""
+        success, response = self.run_test(
+            "Lesson report by student per month",
+            "GET",
+            "reports/lessons",
+            200,
+            params={"period": "month", "group_by": "student"}
+        )
+        if success:
+            total = sum(row['lesson_count'] for row in response)
+            print(f"Report covers {total} lessons in {len(response)} rows")
+            if self.lesson_id and total < 1:
+                print("❌ Created lesson missing from report")
+                return False
+        return success
+
+    def test_availability(self):
+        """Test free slot lookup around the created lesson"""
+        start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        success, response = self.run_test(
+            "Get availability",
+            "GET",
+            "availability",
+            200,
+            params={
+                "from": start.isoformat(),
+                "to": (start + timedelta(days=7)).isoformat(),
+                "duration": 60,
+                "weekdays": "0,1,2,3,4,5,6"
+            }
+        )
+        if success:
+            print(f"Found {len(response)} free slots")
+        invalid, _ = self.run_test(
+            "Reject invalid availability parameters",
+            "GET",
+            "availability",
+            400,
+            params={"from": start.isoformat(), "to": (start + timedelta(days=7)).isoformat(), "weekdays": "mon"}
+        )
+        too_long, _ = self.run_test(
+            "Reject overly long availability range",
+            "GET",
+            "availability",
+            400,
+            params={"from": "0001-01-01T00:00:00", "to": "9999-01-01T00:00:00"}
+        )
+        return success and invalid and too_long
+
+    def test_export_job(self):
+        """Test that a CSV export is queued and can be polled"""
+        success, response = self.run_test(
+            "Queue lesson CSV export",
+            "POST",
+            "reports/lessons/export",
+            202
+        )
+        if not success:
+            return False
+        success, response = self.run_test(
+            "Poll export job",
+            "GET",
+            f"jobs/{response['id']}",
+            200
+        )
+        if success:
+            print(f"Export job status: {response.get('status')}")
+        return success
+
     def test_get_student(self):
         """Test getting a specific student"""
         if not self.student_id:
@@ -205,6 +349,28 @@ class TutorAppTester:
         )
         return success
 
+    def test_bulk_status_update(self):
+        """Test setting payment and homework status for several students at once"""
+        if not self.student_id:
+            print("❌ Cannot test bulk status update: No student ID available")
+            return False
+
+        success, response = self.run_test(
+            "Bulk update student statuses",
+            "PATCH",
+            "students/status",
+            200,
+            data={"updates": [
+                {"id": self.student_id, "payment_status": True, "homework_status": False},
+                {"id": str(uuid.uuid4()), "payment_status": True},
+            ]}
+        )
+        if success:
+            if response != [{"id": self.student_id, "payment_status": True, "homework_status": False}]:
+                print(f"❌ Unexpected bulk status result: {response}")
+                return False
+        return success
+
     def test_create_lesson(self):
         """Test creating a new lesson"""
         if not self.student_id:
@@ -378,6 +544,26 @@ class TutorAppTester:
             print(f"✅ Found {len(response)} lessons")
         return success
 
+    def test_admin_lessons_expanded(self):
+        """Test admin lesson list with embedded students and tutors"""
+        if not self.is_admin:
+            print("❌ Cannot test admin_lessons_expanded: User is not an admin")
+            return False
+
+        success, response = self.run_test(
+            "Get all lessons with student and tutor (admin)",
+            "GET",
+            "admin/lessons",
+            200,
+            params={"expand": "student,tutor"}
+        )
+        if success and response:
+            lesson = next((l for l in response if l['id'] == self.lesson_id), response[0])
+            if not lesson.get('student') or not lesson.get('tutor'):
+                print("❌ Lesson was not expanded")
+                return False
+        return success
+
 def main():
     # Get the backend URL from the frontend .env file
     with open('/app/frontend/.env', 'r') as f:
@@ -423,11 +609,15 @@ def main():
     if not tester.test_create_student():
         print("❌ Student creation failed, stopping student tests")
     else:
+        tester.test_idempotent_create_student()
         tester.test_get_students()
         tester.test_get_student()
+        tester.test_conditional_get("students")
+        tester.test_conditional_get(f"students/{tester.student_id}")
         tester.test_update_student()
         tester.test_update_payment_status()
         tester.test_update_homework_status()
+        tester.test_bulk_status_update()
     
     print("\n===== LESSON MANAGEMENT TESTS =====")
     if tester.student_id:
@@ -436,6 +626,11 @@ def main():
         else:
             tester.test_get_lessons()
             tester.test_get_lesson()
+            tester.test_conditional_get("lessons")
+            tester.test_search()
+            tester.test_lesson_report()
+            tester.test_availability()
+            tester.test_export_job()
             tester.test_update_lesson()
             # Don't delete the lesson yet, we want to test admin views with data
     else:
@@ -448,6 +643,7 @@ def main():
         tester.test_admin_tutors_list()
         tester.test_admin_students_list()
         tester.test_admin_lessons_list()
+        tester.test_admin_lessons_expanded()
     else:
         print("❌ Cannot run admin tests: User is not an admin")
     
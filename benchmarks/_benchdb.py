@@ -0,0 +1,14 @@
+"""Point a benchmark at its throwaway database; import before server.
+
+Benchmarks drop their collections, so they never use DB_NAME, which may
+name real data. The database comes from BENCH_DB_NAME (default
+tutor_app_bench), and any name not ending in _bench is refused.
+"""
+import os
+import sys
+from pathlib import Path
+
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "tutor_app_bench")
+if not os.environ["DB_NAME"].endswith("_bench"):
+    sys.exit("BENCH_DB_NAME must end in _bench; its collections are dropped")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
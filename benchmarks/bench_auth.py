@@ -0,0 +1,57 @@
+"""Per-request auth overhead: token verification with and without the cache.
+
+For HS256, ES256 and EdDSA, times create_access_token, an uncached
+verification (what every request paid before the cache) and
+decode_access_token on a warm cache. No database is needed; keys for the
+asymmetric algorithms are generated in memory.
+
+Usage:
+    python benchmarks/bench_auth.py [iterations]
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import jwt  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519  # noqa: E402
+
+import server  # noqa: E402
+
+
+def keys_for(algorithm):
+    if algorithm == "HS256":
+        return server.SECRET_KEY, server.SECRET_KEY
+    private_key = ec.generate_private_key(ec.SECP256R1()) if algorithm == "ES256" else ed25519.Ed25519PrivateKey.generate()
+    return private_key, private_key.public_key()
+
+
+def per_call_us(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) * 1_000_000 / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    print(f"{'algorithm':<10}{'sign':>12}{'verify':>12}{'cached':>12}   (us per call)")
+    for algorithm in ("HS256", "ES256", "EdDSA"):
+        server.ALGORITHM = algorithm
+        server.SIGNING_KEY, server.VERIFICATION_KEY = keys_for(algorithm)
+        server.token_cache = server.TokenCache(server.TOKEN_CACHE_SIZE)
+        token = server.create_access_token({"sub": "bench@example.com"}, server.timedelta(hours=1))
+        sign = per_call_us(lambda: server.create_access_token({"sub": "bench@example.com"}), iterations // 10)
+        verify = per_call_us(
+            lambda: jwt.decode(token, server.VERIFICATION_KEY, algorithms=[algorithm]), iterations // 10
+        )
+        server.decode_access_token(token)
+        cached = per_call_us(lambda: server.decode_access_token(token), iterations)
+        print(f"{algorithm:<10}{sign:>12.1f}{verify:>12.1f}{cached:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
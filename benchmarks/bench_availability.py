@@ -0,0 +1,70 @@
+"""Latency of GET /api/availability for a tutor with many lessons in the window.
+
+Seeds one tutor with N back-to-back-ish lessons (default 10k) into a
+throwaway database and times the route coroutine, plus the in-memory
+merge/sweep on its own. Target: well under 50 ms per call.
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_availability.py [lessons]
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import _benchdb  # noqa: F401  (selects BENCH_DB_NAME, must precede server)
+import server
+
+WINDOW_START = datetime(2026, 1, 5)
+
+
+async def seed(tutor_id, total):
+    await server.db.lessons.drop()
+    await server.create_indexes()
+    lessons = []
+    # Spread lessons over enough days to fit 10 per working day
+    days = max(1, total // 10)
+    for _ in range(total):
+        day = WINDOW_START + timedelta(days=random.randrange(days))
+        begins = day + timedelta(hours=8, minutes=15 * random.randrange(40))
+        lessons.append({
+            "id": str(uuid.uuid4()), "tutor_id": tutor_id, "student_id": str(uuid.uuid4()),
+            "title": "Bench", "subject": "Maths",
+            "start_time": begins, "end_time": begins + timedelta(minutes=random.choice([30, 45, 60, 90])),
+            "created_at": datetime.utcnow(),
+        })
+    await server.db.lessons.insert_many(lessons, ordered=False)
+    return WINDOW_START + timedelta(days=days)
+
+
+async def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    tutor = {"id": str(uuid.uuid4()), "email": "bench@bench"}
+    window_end = await seed(tutor["id"], total)
+
+    timings = []
+    for _ in range(30):
+        started = time.perf_counter()
+        slots = await server.read_availability(
+            start=WINDOW_START, end=window_end, duration=30, day_start=None, day_end=None,
+            weekdays="0,1,2,3,4,5,6", tz="UTC", current_tutor=tutor,
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"route  {total} lessons -> {len(slots)} slots   p50 {statistics.median(timings):7.2f} ms   max {max(timings):7.2f} ms")
+
+    busy = await server.busy_intervals(tutor["id"], WINDOW_START, window_end)
+    windows = server.working_windows(
+        WINDOW_START, window_end, server.parse_clock("09:00"), server.parse_clock("18:00"),
+        set(range(7)), server.ZoneInfo("UTC"),
+    )
+    started = time.perf_counter()
+    for _ in range(100):
+        server.free_slots(windows, busy, timedelta(minutes=30))
+    print(f"sweep  {len(busy)} busy intervals   {(time.perf_counter() - started) * 10:7.3f} ms per call")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
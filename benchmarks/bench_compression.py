@@ -0,0 +1,70 @@
+"""Compare bytes on the wire and latency for large list responses.
+
+Usage:
+    python benchmarks/bench_compression.py http://localhost:8080 admin@example.com password
+"""
+import statistics
+import sys
+import time
+
+import requests
+
+ENDPOINTS = ["admin/lessons", "admin/students", "lessons"]
+ENCODINGS = ["identity", "gzip", "br"]
+
+
+def login(base_url, email, password):
+    response = requests.post(
+        f"{base_url}/api/token",
+        data={"username": email, "password": password},
+        headers={'Content-Type': 'application/x-www-form-urlencoded'},
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def measure(session, url, encoding, runs):
+    timings = []
+    wire_bytes = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        # stream=True so requests does not decode; we count raw wire bytes
+        response = session.get(url, headers={'Accept-Encoding': encoding}, stream=True)
+        body = response.raw.read(decode_content=False)
+        timings.append((time.perf_counter() - start) * 1000)
+        wire_bytes = len(body)
+    return {
+        "status": response.status_code,
+        "content_encoding": response.headers.get('Content-Encoding', 'identity'),
+        "bytes": wire_bytes,
+        "p50_ms": statistics.median(timings),
+        "max_ms": max(timings),
+    }
+
+
+def main():
+    if len(sys.argv) < 4:
+        print(__doc__)
+        return 1
+    base_url, email, password = sys.argv[1:4]
+    runs = int(sys.argv[4]) if len(sys.argv) > 4 else 20
+
+    session = requests.Session()
+    session.headers['Authorization'] = f'Bearer {login(base_url, email, password)}'
+
+    print(f"{'endpoint':<18}{'accept':<10}{'served':<10}{'bytes':>12}{'p50 ms':>10}{'max ms':>10}")
+    for endpoint in ENDPOINTS:
+        for encoding in ENCODINGS:
+            result = measure(session, f"{base_url}/api/{endpoint}", encoding, runs)
+            if result["status"] != 200:
+                print(f"{endpoint:<18}{encoding:<10}HTTP {result['status']}")
+                continue
+            print(
+                f"{endpoint:<18}{encoding:<10}{result['content_encoding']:<10}"
+                f"{result['bytes']:>12}{result['p50_ms']:>10.1f}{result['max_ms']:>10.1f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""Throughput of POST /api/lessons with and without the student ownership cache.
+
+Seeds one tutor with S students (default 500) into a throwaway database,
+then runs N lesson creates (default 2000) through the route coroutine at
+a fixed concurrency: once with the per-request students.find_one the route
+used to do, once with server.student_owners.
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_lesson_create.py [lessons] [students]
+"""
+import asyncio
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import _benchdb  # noqa: F401  (selects BENCH_DB_NAME, must precede server)
+import server
+
+CONCURRENCY = 16
+
+
+class DirectOwnership:
+    """The pre-cache check: one indexed round trip per lesson write."""
+
+    async def owns(self, tutor_id, student_id):
+        query = {server.ID_KEY: server.db_id(student_id), "tutor_id": tutor_id}
+        return await server.db.students.find_one(query) is not None
+
+
+async def seed(tutor_id, total):
+    for name in ("students", "lessons", "lesson_buckets", "lesson_rollups"):
+        await server.db[name].drop()
+    await server.create_indexes()
+    students = [
+        server.to_db({"id": str(uuid.uuid4()), "tutor_id": tutor_id, "name": f"Student {i}", "notes": ""})
+        for i in range(total)
+    ]
+    await server.db.students.insert_many(students)
+    return [server.api_id(server.doc_id(student)) for student in students]
+
+
+async def run(label, tutor, student_ids, total):
+    queue = asyncio.Queue()
+    base = datetime(2026, 1, 5, 9)
+    for i in range(total):
+        begins = base + timedelta(minutes=30 * i)
+        queue.put_nowait(server.LessonCreate(
+            student_id=random.choice(student_ids), title="Bench", subject="Maths",
+            start_time=begins, end_time=begins + timedelta(minutes=30),
+        ))
+
+    async def worker():
+        while not queue.empty():
+            lesson = queue.get_nowait()
+            await server.create_lesson(lesson=lesson, current_tutor=tutor, idempotent=server.IdempotentCall())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<8} {total} lessons   {total / elapsed:8.0f} lessons/s   {elapsed * 1000 / total:6.2f} ms each")
+
+
+async def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    students = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    tutor = {"id": server.db_id(str(uuid.uuid4())), "email": "bench@bench"}
+    student_ids = await seed(tutor["id"], students)
+
+    cache = server.student_owners
+    server.student_owners = DirectOwnership()
+    await run("direct", tutor, student_ids, total)
+    server.student_owners = cache
+    await run("cached", tutor, student_ids, total)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""Storage size and range-scan latency: one document per lesson vs monthly buckets.
+
+Seeds db.lessons in a throwaway database, copies it into lesson_buckets,
+then prints collStats sizes and the time to read one tutor's month through
+each store.
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_lesson_storage.py [lessons]
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import _benchdb  # noqa: F401  (selects BENCH_DB_NAME, must precede server)
+import server
+
+BATCH = 10_000
+
+
+async def seed(total, tutors=200):
+    db = server.db
+    await db.lessons.drop()
+    await db.lesson_buckets.drop()
+    tutor_ids = [str(uuid.uuid4()) for _ in range(tutors)]
+    inserted = 0
+    while inserted < total:
+        batch = []
+        for _ in range(min(BATCH, total - inserted)):
+            begins = datetime(2022, 1, 1) + timedelta(minutes=30 * random.randrange(2 * 24 * 365 * 3))
+            batch.append({
+                "id": str(uuid.uuid4()), "tutor_id": random.choice(tutor_ids),
+                "student_id": str(uuid.uuid4()), "title": "Weekly lesson", "subject": "Maths",
+                "notes": None, "start_time": begins, "end_time": begins + timedelta(hours=1),
+                "created_at": datetime.utcnow(), "version": 0,
+            })
+        await db.lessons.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    return tutor_ids
+
+
+async def sizes(collection):
+    stats = await server.db.command("collStats", collection.name)
+    return stats["size"], stats["storageSize"], stats["totalIndexSize"], stats["count"]
+
+
+async def scan(store, tutor_id, runs=50):
+    timings = []
+    for _ in range(runs):
+        month = datetime(2023, random.randrange(1, 13), 1)
+        started = time.perf_counter()
+        lessons = await store.find(
+            {"tutor_id": tutor_id, "start_time": {"$gte": month, "$lt": month + timedelta(days=31)}},
+            sort=[("start_time", 1)],
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(lessons)
+
+
+async def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    tutor_ids = await seed(total)
+    documents = server.DocumentLessonStore(server.db.lessons)
+    buckets = server.BucketLessonStore(server.db.lesson_buckets)
+    await documents.create_indexes()
+    await buckets.create_indexes()
+    await buckets.import_from(server.db.lessons)
+
+    print(f"{'layout':<12}{'docs':>10}{'data MB':>10}{'storage MB':>12}{'index MB':>10}{'month scan ms':>15}")
+    for name, store in (("documents", documents), ("buckets", buckets)):
+        size, storage, index, count = await sizes(store.collection)
+        p50, _ = await scan(store, tutor_ids[0])
+        mb = 1024 * 1024
+        print(f"{name:<12}{count:>10}{size / mb:>10.1f}{storage / mb:>12.1f}{index / mb:>10.1f}{p50:>15.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+"""Memory and firing cost of the reminder heap with 1M scheduled lessons.
+
+Pure in-process benchmark of scheduler.ReminderQueue: schedules N
+reminders, reports traced memory, then measures the time to pop a batch of
+due reminders (what bounds firing latency in the scheduler loop).
+
+Usage:
+    python benchmarks/bench_reminder_queue.py [reminders]
+"""
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from scheduler import ReminderQueue  # noqa: E402
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    now = datetime(2026, 3, 2)
+    tutors = [str(uuid.uuid4()) for _ in range(1000)]
+
+    tracemalloc.start()
+    queue = ReminderQueue()
+    started = time.perf_counter()
+    for _ in range(total):
+        queue.schedule(
+            str(uuid.uuid4()), now + timedelta(seconds=random.randrange(24 * 3600)),
+            random.choice(tutors), None,
+        )
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"scheduled {total} reminders in {elapsed:.2f} s ({elapsed / total * 1e6:.2f} us each)")
+    print(f"memory: {current / 2**20:.1f} MiB current, {peak / 2**20:.1f} MiB peak "
+          f"({current / total:.0f} bytes per reminder)")
+
+    # One second of reminders at a uniform 24h spread is ~total/86400 items
+    cursor = now
+    worst = 0.0
+    for _ in range(100):
+        cursor += timedelta(seconds=1)
+        started = time.perf_counter()
+        queue.pop_due(cursor)
+        worst = max(worst, time.perf_counter() - started)
+    print(f"worst pop_due for a 1 s tick: {worst * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Latency of GET /api/search against a large seeded lesson collection.
+
+Seeds a throwaway database (BENCH_DB_NAME, default tutor_app_bench) through
+MONGO_URL and calls the route coroutine directly, so the numbers exclude
+HTTP overhead.
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_search.py [lessons]
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import _benchdb  # noqa: F401  (selects BENCH_DB_NAME, must precede server)
+import server
+
+SUBJECTS = ["Maths", "Physics", "Chemistry", "English", "History", "Biology"]
+WORDS = ["algebra", "vectors", "essay", "revision", "exam", "homework", "kinetics", "poetry"]
+QUERIES = ["Maths", "Phys", "revision", "kinetics exam", "Alg"]
+BATCH = 10_000
+
+
+def make_tutor(tutor_id, is_admin=False):
+    return {"id": tutor_id, "email": f"{tutor_id}@bench", "is_admin": is_admin}
+
+
+async def seed(total_lessons, tutors=100, students_per_tutor=20):
+    db = server.db
+    await db.tutors.drop()
+    await db.students.drop()
+    await db.lessons.drop()
+    await server.create_indexes()
+
+    tutor_ids = [str(uuid.uuid4()) for _ in range(tutors)]
+    students = {
+        tutor_id: [str(uuid.uuid4()) for _ in range(students_per_tutor)]
+        for tutor_id in tutor_ids
+    }
+    await db.students.insert_many([
+        {"id": student_id, "tutor_id": tutor_id, "name": f"Student {student_id[:6]}",
+         "notes": " ".join(random.sample(WORDS, 2)), "created_at": datetime.utcnow()}
+        for tutor_id, ids in students.items() for student_id in ids
+    ])
+
+    start = datetime(2020, 1, 1)
+    inserted = 0
+    while inserted < total_lessons:
+        batch = []
+        for _ in range(min(BATCH, total_lessons - inserted)):
+            tutor_id = random.choice(tutor_ids)
+            subject = random.choice(SUBJECTS)
+            begins = start + timedelta(hours=random.randrange(24 * 365 * 5))
+            batch.append({
+                "id": str(uuid.uuid4()), "tutor_id": tutor_id,
+                "student_id": random.choice(students[tutor_id]),
+                "title": f"{subject} {random.choice(WORDS)}", "subject": subject,
+                "notes": " ".join(random.sample(WORDS, 3)),
+                "start_time": begins, "end_time": begins + timedelta(hours=1),
+                "created_at": datetime.utcnow(),
+            })
+        await db.lessons.insert_many(batch, ordered=False)
+        inserted += len(batch)
+    return tutor_ids
+
+
+async def time_queries(tutor, scope, runs=20):
+    for q in QUERIES:
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            await server.search(q=q, limit=20, skip=0, scope=scope, current_tutor=tutor)
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"{scope:<5}{q:<16}p50 {statistics.median(timings):8.2f} ms   max {max(timings):8.2f} ms")
+
+
+async def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"Seeding {total} lessons...")
+    tutor_ids = await seed(total)
+    await time_queries(make_tutor(tutor_ids[0]), "own")
+    await time_queries(make_tutor(tutor_ids[0], is_admin=True), "all", runs=5)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""Lesson-read latency while /api/token is under a credential-stuffing burst.
+
+Measures GET /api/lessons for a legitimate tutor first on an idle server,
+then while attacker threads hammer /api/token with wrong passwords, and
+reports how the attack requests were answered (401/429/503).
+
+Usage:
+    python benchmarks/load_login_attack.py http://localhost:8080 tutor@example.com password [attackers] [seconds]
+"""
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def login(base_url, email, password):
+    response = requests.post(
+        f"{base_url}/api/token",
+        data={"username": email, "password": password},
+        headers={'Content-Type': 'application/x-www-form-urlencoded'},
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def sample_reads(base_url, token, seconds):
+    session = requests.Session()
+    session.headers['Authorization'] = f'Bearer {token}'
+    timings = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        session.get(f"{base_url}/api/lessons")
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def attack(base_url, stop, outcomes, victim_email):
+    session = requests.Session()
+    while not stop.is_set():
+        # Alternate between a fixed victim and random accounts
+        username = victim_email if uuid.uuid4().int % 2 else f"{uuid.uuid4().hex[:8]}@example.com"
+        response = session.post(
+            f"{base_url}/api/token",
+            data={"username": username, "password": "wrong-password"},
+            headers={'Content-Type': 'application/x-www-form-urlencoded'},
+        )
+        outcomes[response.status_code] += 1
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p99 = timings[int(len(timings) * 0.99) - 1] if len(timings) >= 100 else timings[-1]
+    print(f"{label:<16}{len(timings):>8} reads   p50 {statistics.median(timings):7.1f} ms   p99 {p99:7.1f} ms")
+
+
+def main():
+    if len(sys.argv) < 4:
+        print(__doc__)
+        return 1
+    base_url, email, password = sys.argv[1:4]
+    attackers = int(sys.argv[4]) if len(sys.argv) > 4 else 32
+    seconds = float(sys.argv[5]) if len(sys.argv) > 5 else 10
+
+    token = login(base_url, email, password)
+    report("idle", sample_reads(base_url, token, seconds))
+
+    stop = threading.Event()
+    outcomes = Counter()
+    with ThreadPoolExecutor(max_workers=attackers) as pool:
+        for _ in range(attackers):
+            pool.submit(attack, base_url, stop, outcomes, email)
+        timings = sample_reads(base_url, token, seconds)
+        stop.set()
+    report("under attack", timings)
+    print("attack responses:", dict(outcomes))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,10 +5,21 @@ set -e
 cd /backend || { echo "Backend directory not found"; exit 1; }
 
 echo "Starting FastAPI backend"
+# Exported so the in-process rate limiters can split limits between workers
+export UVICORN_WORKERS="${UVICORN_WORKERS:-2}"
 # Start Uvicorn with proper host binding
-uvicorn server:app --host 0.0.0.0 --port 8001 &
+# Keep-alive must outlive nginx's upstream keepalive_timeout (60s)
+uvicorn server:app --host 0.0.0.0 --port 8001 \
+    --workers "$UVICORN_WORKERS" --timeout-keep-alive 75 &
 BACKEND_PID=$!
 
+start_worker() {
+    echo "Starting job worker"
+    python3 worker.py --concurrency "${WORKER_CONCURRENCY:-4}" &
+    WORKER_PID=$!
+}
+start_worker
+
 echo "Waiting for backend to start..."
 sleep 30
 
@@ -22,20 +33,21 @@ nginx -g 'daemon off;' &
 NGINX_PID=$!
 
 # Handle termination signals
-trap 'kill $BACKEND_PID $NGINX_PID; exit 0' SIGTERM SIGINT
+trap 'kill $BACKEND_PID $WORKER_PID $NGINX_PID; exit 0' SIGTERM SIGINT
 
-# Check if processes are still running
+# Check if processes are still running; the job worker is restarted rather
+# than taking the API down with it
 while kill -0 $BACKEND_PID 2>/dev/null && kill -0 $NGINX_PID 2>/dev/null; do
+    if ! kill -0 $WORKER_PID 2>/dev/null; then
+        echo "Job worker exited, restarting in 5s..."
+        sleep 5
+        start_worker
+    fi
     sleep 1
 done
 
 # If we get here, one of the processes died
-if kill -0 $BACKEND_PID 2>/dev/null; then
-    echo "Nginx died, shutting down backend..."
-    kill $BACKEND_PID
-else
-    echo "Backend died, shutting down nginx..."
-    kill $NGINX_PID
-fi
+echo "A service exited, shutting down the others..."
+kill $BACKEND_PID $WORKER_PID $NGINX_PID 2>/dev/null || true
 
 exit 1
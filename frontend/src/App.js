@@ -28,6 +28,11 @@ axios.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    // Lets reads served by a database secondary include our own writes
+    const sessionToken = sessionStorage.getItem("sessionToken");
+    if (sessionToken) {
+      config.headers["X-Session-Token"] = sessionToken;
+    }
     return config;
   },
   (error) => {
@@ -35,6 +40,19 @@ axios.interceptors.request.use(
   }
 );
 
+axios.interceptors.response.use(
+  (response) => {
+    const sessionToken = response.headers["x-session-token"];
+    if (sessionToken) {
+      sessionStorage.setItem("sessionToken", sessionToken);
+    }
+    return response;
+  },
+  (error) => {
+    return Promise.reject(error);
+  }
+);
+
 function App() {
   const [isLoggedIn, setIsLoggedIn] = useState(false);
   const [loading, setLoading] = useState(true);
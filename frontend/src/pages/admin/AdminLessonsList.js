@@ -6,8 +6,6 @@ const API = `${BACKEND_URL}/api`;
 
 function AdminLessonsList() {
   const [lessons, setLessons] = useState([]);
-  const [tutors, setTutors] = useState([]);
-  const [students, setStudents] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
   const [searchTerm, setSearchTerm] = useState("");
@@ -18,15 +16,11 @@ function AdminLessonsList() {
     const fetchData = async () => {
       setLoading(true);
       try {
-        const [lessonsResponse, tutorsResponse, studentsResponse] = await Promise.all([
-          axios.get(`${API}/admin/lessons`),
-          axios.get(`${API}/admin/tutors`),
-          axios.get(`${API}/admin/students`)
-        ]);
+        const lessonsResponse = await axios.get(`${API}/admin/lessons`, {
+          params: { expand: "student,tutor" }
+        });
         
         setLessons(lessonsResponse.data);
-        setTutors(tutorsResponse.data);
-        setStudents(studentsResponse.data);
         setError("");
       } catch (error) {
         console.error("Error fetching data:", error);
@@ -39,14 +33,20 @@ function AdminLessonsList() {
     fetchData();
   }, []);
 
-  const getTutorName = (tutorId) => {
-    const tutor = tutors.find(t => t.id === tutorId);
-    return tutor ? tutor.name : "Unknown Tutor";
+  // Tutors that have lessons, for the filter dropdown
+  const tutors = Object.values(
+    lessons.reduce((byId, lesson) => {
+      if (lesson.tutor) byId[lesson.tutor.id] = lesson.tutor;
+      return byId;
+    }, {})
+  );
+
+  const getTutorName = (lesson) => {
+    return lesson.tutor ? lesson.tutor.name : "Unknown Tutor";
   };
 
-  const getStudentName = (studentId) => {
-    const student = students.find(s => s.id === studentId);
-    return student ? student.name : "Unknown Student";
+  const getStudentName = (lesson) => {
+    return lesson.student ? lesson.student.name : "Unknown Student";
   };
 
   const formatDateTime = (dateString) => {
@@ -72,7 +72,7 @@ function AdminLessonsList() {
     const matchesSearch = 
       lesson.title.toLowerCase().includes(searchTerm.toLowerCase()) ||
       lesson.subject.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      getStudentName(lesson.student_id).toLowerCase().includes(searchTerm.toLowerCase());
+      getStudentName(lesson).toLowerCase().includes(searchTerm.toLowerCase());
     
     const matchesTutor = tutorFilter ? lesson.tutor_id === tutorFilter : true;
     
@@ -157,10 +157,10 @@ function AdminLessonsList() {
                     {lesson.subject}
                   </td>
                   <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-600">
-                    {getTutorName(lesson.tutor_id)}
+                    {getTutorName(lesson)}
                   </td>
                   <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-600">
-                    {getStudentName(lesson.student_id)}
+                    {getStudentName(lesson)}
                   </td>
                   <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-600">
                     {formatDateTime(lesson.start_time)}
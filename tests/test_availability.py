@@ -0,0 +1,93 @@
+import sys
+from datetime import datetime, time, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from server import LessonRequest, free_slots, merge_intervals, place_lessons, working_windows  # noqa: E402
+
+UTC = ZoneInfo("UTC")
+WEEK = set(range(7))
+
+
+def at(day, hour, minute=0):
+    return datetime(2026, 3, day, hour, minute)
+
+
+def test_merge_intervals_joins_overlapping_and_adjacent():
+    merged = merge_intervals([
+        (at(2, 9), at(2, 10)),
+        (at(2, 9, 30), at(2, 11)),
+        (at(2, 11), at(2, 12)),   # adjacent
+        (at(2, 9, 45), at(2, 10)),  # contained
+        (at(2, 13), at(2, 14)),
+    ])
+
+    assert merged == [[at(2, 9), at(2, 12)], [at(2, 13), at(2, 14)]]
+
+
+def test_free_slots_subtracts_busy_time_crossing_window_edges():
+    windows = [(at(2, 9), at(2, 17)), (at(3, 9), at(3, 17))]
+    busy = [
+        [at(2, 8), at(2, 10)],     # starts before the window opens
+        [at(2, 12), at(2, 12, 30)],
+        [at(2, 16, 30), at(3, 9, 30)],  # runs overnight into the next window
+    ]
+
+    slots = free_slots(windows, busy, timedelta(minutes=60))
+
+    assert slots == [
+        (at(2, 10), at(2, 12)),
+        (at(2, 12, 30), at(2, 16, 30)),
+        (at(3, 9, 30), at(3, 17)),
+    ]
+
+
+def test_free_slots_drops_gaps_shorter_than_duration():
+    busy = [[at(2, 10), at(2, 11)], [at(2, 11, 30), at(2, 17)]]
+
+    assert free_slots([(at(2, 9), at(2, 17))], busy, timedelta(minutes=45)) == [(at(2, 9), at(2, 10))]
+
+
+def test_working_windows_follow_dst_and_weekdays():
+    # Europe/London moves to BST on Sunday 29 March 2026
+    windows = working_windows(at(27, 0), at(31, 0), time(9), time(17), {0, 1, 2, 3, 4}, ZoneInfo("Europe/London"))
+
+    assert windows == [(at(27, 9), at(27, 17)), (at(30, 8), at(30, 16))]
+
+
+def test_working_windows_in_offset_timezone_span_utc_dates():
+    # 08:00-20:00 in Sydney (UTC+11) is 21:00-09:00 UTC, clipped to the range
+    windows = working_windows(at(1, 0), at(3, 0), time(8), time(20), WEEK, ZoneInfo("Australia/Sydney"))
+
+    assert windows == [(at(1, 0), at(1, 9)), (at(1, 21), at(2, 9)), (at(2, 21), at(3, 0))]
+
+
+def test_place_lessons_longest_first_and_reports_leftovers():
+    slots = [[at(2, 9), at(2, 11)], [at(3, 9), at(3, 10)]]
+    requests = [
+        LessonRequest(student_id="short", duration_minutes=60, count=2),
+        LessonRequest(student_id="long", duration_minutes=120, count=2),
+    ]
+
+    placed, unplaced = place_lessons(slots, requests, UTC)
+
+    assert [(lesson.student_id, lesson.start_time) for lesson in placed] == [
+        ("long", at(2, 9)),
+        ("short", at(3, 9)),
+    ]
+    assert [(request.student_id, request.count) for request in unplaced] == [("long", 1), ("short", 1)]
+
+
+def test_place_lessons_allows_one_lesson_per_local_day():
+    # Both slots fall on 1 March UTC, but on 1 and 2 March in Sydney
+    slots = [[at(1, 10), at(1, 12)], [at(1, 21), at(1, 23)]]
+    request = LessonRequest(student_id="student", duration_minutes=60, count=3)
+
+    placed, unplaced = place_lessons([list(slot) for slot in slots], [request], ZoneInfo("Australia/Sydney"))
+    assert [lesson.start_time for lesson in placed] == [at(1, 10), at(1, 21)]
+    assert unplaced[0].count == 1
+
+    placed, _ = place_lessons([list(slot) for slot in slots], [request], UTC)
+    assert [lesson.start_time for lesson in placed] == [at(1, 10)]
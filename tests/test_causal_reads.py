@@ -0,0 +1,131 @@
+"""Reads sent to secondaries must still include the client's own writes.
+
+Starts a throwaway three-node replica set from the local mongod binary,
+with test commands enabled so replication can be paused. The backend
+runs with READ_PREFERENCE=secondary and w=1 writes. Replication to both
+secondaries is stopped before a student is created, so the secondaries
+are known to be stale. A read without the session token is served stale
+by a secondary, while one carrying the X-Session-Token from the write must
+wait for a secondary to catch up. Skipped when the binary is not installed.
+"""
+import importlib
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from pymongo import MongoClient
+
+from .test_sharding import free_port, wait_for
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+DB_NAME = "tutor_app_causal_test"
+REPLICA_SET = "causal"
+
+pytestmark = pytest.mark.skipif(not shutil.which("mongod"), reason="mongod binary is required for the replica set")
+
+
+@pytest.fixture(scope="module")
+def replica_set(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("replica_set")
+    processes, ports = [], []
+    try:
+        for member in range(3):
+            port = free_port()
+            dbpath = tmp_path / f"node{member}"
+            dbpath.mkdir()
+            processes.append(subprocess.Popen(
+                ["mongod", "--replSet", REPLICA_SET, "--port", str(port), "--dbpath", str(dbpath),
+                 "--bind_ip", "127.0.0.1", "--setParameter", "enableTestCommands=1"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            ))
+            ports.append(port)
+        for port in ports:
+            wait_for(port)
+        primary = MongoClient(port=ports[0], directConnection=True)
+        primary.admin.command("replSetInitiate", {"_id": REPLICA_SET, "members": [
+            # Only the first node can become primary, so the others stay secondaries
+            {"_id": member, "host": f"127.0.0.1:{port}", "priority": 1 if member == 0 else 0}
+            for member, port in enumerate(ports)
+        ]})
+        deadline = time.monotonic() + 60
+        while [member["stateStr"] for member in primary.admin.command("replSetGetStatus")["members"]] != [
+            "PRIMARY", "SECONDARY", "SECONDARY"
+        ]:
+            if time.monotonic() > deadline:
+                raise RuntimeError("replica set did not come up")
+            time.sleep(0.5)
+        hosts = ",".join(f"127.0.0.1:{port}" for port in ports)
+        yield {
+            "url": f"mongodb://{hosts}/?replicaSet={REPLICA_SET}&w=1",
+            "secondaries": [MongoClient(port=port, directConnection=True) for port in ports[1:]],
+        }
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=30)
+
+
+@pytest.fixture(scope="module")
+def app_client(replica_set):
+    os.environ["MONGO_URL"] = replica_set["url"]
+    os.environ["DB_NAME"] = DB_NAME
+    os.environ["READ_PREFERENCE"] = "secondary"
+    sys.path.insert(0, str(BACKEND_DIR))
+    try:
+        server = importlib.reload(sys.modules["server"]) if "server" in sys.modules else importlib.import_module("server")
+        from fastapi.testclient import TestClient
+
+        with TestClient(server.app) as client:
+            yield server, client
+    finally:
+        del os.environ["READ_PREFERENCE"]
+
+
+def set_replication(secondaries, paused):
+    for secondary in secondaries:
+        secondary.admin.command("configureFailPoint", "stopReplProducer", mode="alwaysOn" if paused else "off")
+
+
+def secondary_reads(secondaries):
+    return sum(secondary.admin.command("serverStatus")["opcounters"]["query"] for secondary in secondaries)
+
+
+def test_secondary_reads_see_own_writes(replica_set, app_client):
+    server, client = app_client
+    secondaries = replica_set["secondaries"]
+    email = "causal@example.com"
+    assert client.post("/api/tutors", json={"email": email, "name": "Causal", "password": "secret"}).status_code == 200
+    login = client.post("/api/token", data={"username": email, "password": "secret"})
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    set_replication(secondaries, paused=True)
+    try:
+        created = client.post("/api/students", json={"name": "Fresh student"}, headers=headers)
+        assert created.status_code == 200, created.text
+        token = created.headers[server.SESSION_TOKEN_HEADER]
+        student_id = created.json()["id"]
+        for secondary in secondaries:
+            assert secondary[DB_NAME].students.find_one({"name": "Fresh student"}) is None
+
+        # Without the token nothing makes the secondary wait
+        reads_before = secondary_reads(secondaries)
+        stale = client.get("/api/students", headers=headers)
+        assert stale.status_code == 200, stale.text
+        assert student_id not in [student["id"] for student in stale.json()]
+        assert secondary_reads(secondaries) > reads_before
+    finally:
+        # Resume shortly, while the read below is already waiting
+        threading.Timer(1.0, set_replication, (secondaries, False)).start()
+
+    reads_before = secondary_reads(secondaries)
+    listed = client.get("/api/students", headers={**headers, server.SESSION_TOKEN_HEADER: token})
+    assert listed.status_code == 200, listed.text
+    assert student_id in [student["id"] for student in listed.json()]
+    assert secondary_reads(secondaries) > reads_before
+    assert server.decode_session_token(listed.headers[server.SESSION_TOKEN_HEADER])[1] >= \
+        server.decode_session_token(token)[1]
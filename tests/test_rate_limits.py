@@ -0,0 +1,109 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+from server import ConcurrencyLimiter, TokenBucketLimiter, parse_rate  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(server, "time", clock)
+    return clock
+
+
+def hit(limiter, key, cost=1):
+    return asyncio.run(limiter.hit(key, cost))
+
+
+def test_parse_rate_accepts_fractional_rates():
+    assert parse_rate("0.5/20") == (0.5, 20)
+
+
+@pytest.mark.parametrize("spec", ["0/5", "-1/5", "1/0", "abc", "1/2/3", "1/1.5"])
+def test_parse_rate_rejects_invalid_specs(spec):
+    with pytest.raises(ValueError, match="Invalid rate limit"):
+        parse_rate(spec)
+
+
+def test_burst_then_refill(clock):
+    limiter = TokenBucketLimiter("test", "1/3")
+
+    assert [hit(limiter, "ip") for _ in range(3)] == [0, 0, 0]
+    assert hit(limiter, "ip") == pytest.approx(1.0)
+    assert hit(limiter, "other") == 0
+
+    clock.now += 1.5
+    assert hit(limiter, "ip") == 0
+    assert hit(limiter, "ip") == pytest.approx(0.5)
+
+
+def test_zero_cost_checks_without_taking(clock):
+    limiter = TokenBucketLimiter("test", "1/1")
+
+    assert hit(limiter, "account", cost=0) == 0
+    assert hit(limiter, "account", cost=0) == 0
+    assert hit(limiter, "account") == 0
+    assert hit(limiter, "account", cost=0) > 0
+
+
+def test_workers_split_rate_and_burst(clock):
+    limiter = TokenBucketLimiter("test", "2/4", workers=2)
+    assert (limiter.rate, limiter.burst) == (1.0, 2.0)
+
+    # Bursts never drop below one request per worker
+    assert TokenBucketLimiter("test", "1/3", workers=4).burst == 1.0
+
+
+def test_bucket_count_is_lru_bounded(clock):
+    limiter = TokenBucketLimiter("test", "1/1", max_keys=2)
+    hit(limiter, "a")
+    hit(limiter, "b")
+    hit(limiter, "a")
+    hit(limiter, "c")
+
+    assert list(limiter.buckets) == ["a", "c"]
+    # An evicted key starts again with a full bucket
+    assert hit(limiter, "b") == 0
+
+
+def test_concurrency_limiter_sheds_beyond_max_waiting():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_waiting=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+
+        with pytest.raises(HTTPException) as rejected:
+            async with limiter.slot():
+                pass
+        release.set()
+        await asyncio.gather(holder, waiter)
+        assert limiter.waiting == 0
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == "1"
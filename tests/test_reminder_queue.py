@@ -0,0 +1,152 @@
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import scheduler  # noqa: E402
+from scheduler import ReminderQueue, ReminderScheduler, SeenEvents  # noqa: E402
+
+NOW = datetime(2026, 3, 2, 9, 0)
+
+
+def test_pop_due_returns_reminders_in_fire_order():
+    queue = ReminderQueue()
+    queue.schedule("late", NOW + timedelta(minutes=5), "tutor")
+    queue.schedule("early", NOW - timedelta(minutes=1), "tutor")
+    queue.schedule("now", NOW, "tutor")
+
+    due = queue.pop_due(NOW)
+
+    assert [lesson_id for lesson_id, _, _ in due] == ["early", "now"]
+    assert queue.next_fire_at() == NOW + timedelta(minutes=5)
+    assert len(queue) == 1
+
+
+def test_reschedule_and_cancel_skip_stale_heap_entries():
+    queue = ReminderQueue()
+    queue.schedule("moved", NOW, "tutor")
+    queue.schedule("moved", NOW + timedelta(hours=1), "tutor")
+    queue.schedule("cancelled", NOW, "tutor")
+    queue.cancel("cancelled")
+
+    assert queue.pop_due(NOW) == []
+    assert queue.next_fire_at() == NOW + timedelta(hours=1)
+
+
+def test_purge_removes_only_matching_student():
+    queue = ReminderQueue()
+    queue.schedule("a", NOW, "tutor", "student-1")
+    queue.schedule("b", NOW, "tutor", "student-2")
+    queue.schedule("c", NOW, "other", "student-1")
+
+    queue.purge("tutor", "student-1")
+
+    assert sorted(lesson_id for lesson_id, _, _ in queue.pop_due(NOW)) == ["b", "c"]
+
+
+def test_heap_is_compacted_after_many_reschedules():
+    queue = ReminderQueue()
+    for minute in range(5000):
+        queue.schedule("same", NOW + timedelta(minutes=minute), "tutor")
+
+    assert len(queue) == 1
+    assert len(queue.heap) <= 2 * len(queue) + 1024
+
+
+def test_seen_events_resume_with_overlap_and_skip_duplicates():
+    seen = SeenEvents(NOW, timedelta(seconds=30))
+    assert seen.resume_at() == NOW - timedelta(seconds=30)
+
+    # Ids from different processes arrive out of order within the same second
+    assert seen.add({"_id": "b", "at": NOW + timedelta(seconds=60)})
+    assert seen.add({"_id": "a", "at": NOW + timedelta(seconds=60)})
+    assert seen.add({"_id": "old", "at": NOW})
+    assert not seen.add({"_id": "a", "at": NOW + timedelta(seconds=60)})
+
+    assert seen.resume_at() == NOW + timedelta(seconds=30)
+    seen.prune()
+    assert set(seen.ids) == {"a", "b"}
+
+
+class FakeLessonStore:
+    def __init__(self, lessons):
+        self.lessons = lessons
+
+    async def find(self, query, projection=None):
+        bounds = query["start_time"]
+        return [
+            lesson for lesson in self.lessons
+            if (lesson["start_time"] > bounds["$gt"] if "$gt" in bounds else lesson["start_time"] >= bounds["$gte"])
+            and lesson["start_time"] < bounds["$lt"]
+        ]
+
+
+def test_first_load_fires_overdue_reminders_after_restart(monkeypatch):
+    now = datetime.utcnow()
+    monkeypatch.setattr(scheduler.server, "lesson_store", FakeLessonStore([
+        {"id": "soon", "tutor_id": "tutor", "start_time": now + timedelta(minutes=5)},
+        {"id": "later", "tutor_id": "tutor", "start_time": now + timedelta(hours=2)},
+        {"id": "started", "tutor_id": "tutor", "start_time": now - timedelta(minutes=5)},
+    ]))
+    reminders = ReminderScheduler(sender=None)
+
+    asyncio.run(reminders.extend_horizon())
+
+    assert set(reminders.queue.entries) == {"soon", "later"}
+    assert [lesson_id for lesson_id, _, _ in reminders.queue.pop_due(datetime.utcnow())] == ["soon"]
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = {doc["_id"]: doc for doc in docs}
+
+    async def insert_one(self, doc):
+        if doc["_id"] in self.docs:
+            raise scheduler.DuplicateKeyError("duplicate")
+        self.docs[doc["_id"]] = doc
+
+    async def delete_one(self, query):
+        self.docs.pop(query["_id"], None)
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["_id"])
+
+
+class FailingSender:
+    def __init__(self):
+        self.attempts = 0
+
+    async def send(self, to, subject, body):
+        self.attempts += 1
+        raise ConnectionRefusedError("smtp down")
+
+
+def test_failed_send_releases_the_reminder(monkeypatch):
+    class FakeDb:
+        reminders_sent = FakeCollection()
+        tutors = FakeCollection([{"_id": "tutor", "email": "tutor@example.com"}])
+        students = FakeCollection()
+
+    class FakeStore:
+        async def find_one(self, tutor_id, lesson_id):
+            return {"tutor_id": "tutor", "student_id": "student", "title": "Maths", "subject": "Maths",
+                    "start_time": NOW}
+
+    monkeypatch.setattr(scheduler.server, "db", FakeDb)
+    monkeypatch.setattr(scheduler.server, "lesson_store", FakeStore())
+    monkeypatch.setattr(scheduler.server, "ID_KEY", "_id")
+    monkeypatch.setattr(scheduler, "REMINDER_SEND_ATTEMPTS", 1)
+    sender = FailingSender()
+    reminders = ReminderScheduler(sender)
+
+    async def fire():
+        reminders.start_firing("lesson", NOW, "tutor")
+        await asyncio.gather(*reminders.firing, return_exceptions=True)
+
+    asyncio.run(fire())
+
+    assert sender.attempts == 1
+    assert FakeDb.reminders_sent.docs == {}
+    assert not reminders.firing
@@ -0,0 +1,198 @@
+"""Tutor-scoped routes must be single-shard targeted on a sharded cluster.
+
+Starts a throwaway cluster (one config server, two single-node shard
+replica sets and a mongos) from the local mongod/mongos binaries. Each
+collection in server.SHARD_KEYS is sharded and split so that two tutors
+live on different shards. Every tutor-scoped route is then called with the
+shard profilers on, and the test asserts that only one shard saw
+operations on tutor data. Skipped when the binaries are not installed.
+"""
+import importlib
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from bson import MinKey
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+DB_NAME = "tutor_app_shard_test"
+
+pytestmark = pytest.mark.skipif(
+    not (shutil.which("mongod") and shutil.which("mongos")),
+    reason="mongod/mongos binaries are required for the sharded cluster",
+)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            MongoClient(port=port, directConnection=True, serverSelectionTimeoutMS=500).admin.command("ping")
+            return
+        except Exception:
+            time.sleep(0.5)
+    raise RuntimeError(f"mongo process on port {port} did not start")
+
+
+def start_replica_set(tmp_path, name, role):
+    port = free_port()
+    dbpath = tmp_path / name
+    dbpath.mkdir()
+    process = subprocess.Popen(
+        ["mongod", role, "--replSet", name, "--port", str(port), "--dbpath", str(dbpath),
+         "--bind_ip", "127.0.0.1"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    wait_for(port)
+    node = MongoClient(port=port, directConnection=True)
+    node.admin.command("replSetInitiate", {"_id": name, "members": [{"_id": 0, "host": f"127.0.0.1:{port}"}]})
+    deadline = time.monotonic() + 60
+    while not node.admin.command("hello").get("isWritablePrimary"):
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"{name} did not elect a primary")
+        time.sleep(0.5)
+    return process, port
+
+
+@pytest.fixture(scope="module")
+def cluster(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("cluster")
+    processes = []
+    try:
+        config, config_port = start_replica_set(tmp_path, "cfg", "--configsvr")
+        shard_a, port_a = start_replica_set(tmp_path, "shard_a", "--shardsvr")
+        shard_b, port_b = start_replica_set(tmp_path, "shard_b", "--shardsvr")
+        processes += [config, shard_a, shard_b]
+        mongos_port = free_port()
+        processes.append(subprocess.Popen(
+            ["mongos", "--configdb", f"cfg/127.0.0.1:{config_port}", "--port", str(mongos_port),
+             "--bind_ip", "127.0.0.1"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+        wait_for(mongos_port)
+        mongos = MongoClient(port=mongos_port)
+        mongos.admin.command("addShard", f"shard_a/127.0.0.1:{port_a}")
+        mongos.admin.command("addShard", f"shard_b/127.0.0.1:{port_b}")
+        yield {
+            "mongos": mongos,
+            "url": f"mongodb://127.0.0.1:{mongos_port}",
+            "shards": {
+                "shard_a": MongoClient(port=port_a, directConnection=True),
+                "shard_b": MongoClient(port=port_b, directConnection=True),
+            },
+        }
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=30)
+
+
+@pytest.fixture(scope="module")
+def app_client(cluster):
+    os.environ["MONGO_URL"] = cluster["url"]
+    os.environ["DB_NAME"] = DB_NAME
+    sys.path.insert(0, str(BACKEND_DIR))
+    server = importlib.reload(sys.modules["server"]) if "server" in sys.modules else importlib.import_module("server")
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app) as client:
+        yield server, client
+
+
+def register(client, name):
+    email = f"{name}@example.com"
+    assert client.post("/api/tutors", json={"email": email, "name": name, "password": "secret"}).status_code == 200
+    token = client.post("/api/token", data={"username": email, "password": "secret"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    return client.get("/api/tutors/me", headers=headers).json()["id"], headers
+
+
+def shard_collections(cluster, server, tutor_ids):
+    """Shard per SHARD_KEYS and put each tutor's range on its own shard."""
+    mongos = cluster["mongos"]
+    mongos.admin.command("enableSharding", DB_NAME)
+    high = server.db_id(max(tutor_ids))
+    for name, key in server.SHARD_KEYS.items():
+        namespace = f"{DB_NAME}.{name}"
+        try:
+            mongos[DB_NAME][name].create_index(key)
+        except OperationFailure:
+            pass  # startup already created it, possibly unique
+        mongos.admin.command("shardCollection", namespace, key=dict(key))
+        split_point = {field: (high if field == "tutor_id" else MinKey()) for field, _ in key}
+        mongos.admin.command("split", namespace, middle=split_point)
+        owner = mongos.config.chunks.find_one({"min": split_point}) or {}
+        target = "shard_b" if owner.get("shard") != "shard_b" else "shard_a"
+        mongos.admin.command("moveChunk", namespace, find=split_point, to=target, _secondaryThrottle=True)
+
+
+def profile_counts(cluster):
+    counts = {}
+    for name, shard in cluster["shards"].items():
+        counts[name] = shard[DB_NAME]["system.profile"].count_documents(
+            {"ns": {"$in": [f"{DB_NAME}.{collection}" for collection in ("students", "lessons", "lesson_buckets", "lesson_rollups")]}}
+        )
+    return counts
+
+
+def shards_touched(cluster, call):
+    before = profile_counts(cluster)
+    response = call()
+    assert response.status_code < 400, response.text
+    after = profile_counts(cluster)
+    return response, [name for name in after if after[name] > before[name]]
+
+
+def test_tutor_scoped_routes_target_one_shard(cluster, app_client):
+    server, client = app_client
+    first_id, first = register(client, "first")
+    second_id, second = register(client, "second")
+    shard_collections(cluster, server, [first_id, second_id])
+
+    for headers in (first, second):
+        student = client.post("/api/students", json={"name": "Student"}, headers=headers).json()
+        start = datetime(2026, 3, 2, 10)
+        client.post("/api/lessons", json={
+            "title": "Algebra", "subject": "Maths", "student_id": student["id"],
+            "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat(),
+        }, headers=headers)
+
+    for shard in cluster["shards"].values():
+        shard[DB_NAME].command("profile", 2)
+
+    student_id = client.get("/api/students", headers=first).json()[0]["id"]
+    lesson = client.get("/api/lessons", headers=first).json()[0]
+    lesson_body = {k: lesson[k] for k in ("title", "subject", "student_id", "start_time", "end_time")}
+    calls = {
+        "read_students": lambda: client.get("/api/students", headers=first),
+        "read_student": lambda: client.get(f"/api/students/{student_id}", headers=first),
+        "update_student": lambda: client.put(f"/api/students/{student_id}", json={"name": "Renamed"}, headers=first),
+        "update_payment_status": lambda: client.put(f"/api/students/{student_id}/payment", headers=first),
+        "update_homework_status": lambda: client.put(f"/api/students/{student_id}/homework", headers=first),
+        "read_lessons": lambda: client.get("/api/lessons", params={"expand": "student"}, headers=first),
+        "read_lesson": lambda: client.get(f"/api/lessons/{lesson['id']}", headers=first),
+        "update_lesson": lambda: client.put(f"/api/lessons/{lesson['id']}", json=lesson_body, headers=first),
+        "create_lesson": lambda: client.post("/api/lessons", json=lesson_body, headers=first),
+        "availability": lambda: client.get("/api/availability", params={
+            "from": "2026-03-02T00:00:00", "to": "2026-03-09T00:00:00"}, headers=first),
+        "lesson_report": lambda: client.get("/api/reports/lessons", headers=first),
+        "delete_lesson": lambda: client.delete(f"/api/lessons/{lesson['id']}", headers=first),
+        "delete_student": lambda: client.delete(f"/api/students/{student_id}", headers=first),
+    }
+    for route, call in calls.items():
+        _, touched = shards_touched(cluster, call)
+        assert len(touched) <= 1, f"{route} was scatter-gather across {touched}"
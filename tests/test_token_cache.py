@@ -0,0 +1,30 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from server import TokenCache  # noqa: E402
+
+
+def test_expired_claims_are_dropped():
+    cache = TokenCache(10)
+    cache.put(b"live", {"sub": "a", "exp": time.time() + 60})
+    cache.put(b"expired", {"sub": "b", "exp": time.time() - 1})
+
+    assert cache.get(b"live")["sub"] == "a"
+    assert cache.get(b"expired") is None
+    assert b"expired" not in cache.claims
+    assert cache.get(b"unknown") is None
+
+
+def test_least_recently_used_token_is_evicted():
+    cache = TokenCache(2)
+    exp = time.time() + 60
+    cache.put(b"a", {"sub": "a", "exp": exp})
+    cache.put(b"b", {"sub": "b", "exp": exp})
+    cache.get(b"a")
+    cache.put(b"c", {"sub": "c", "exp": exp})
+
+    assert list(cache.claims) == [b"a", b"c"]
+    assert cache.get(b"b") is None
@@ -0,0 +1,32 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+import worker  # noqa: E402
+
+
+def test_work_survives_database_errors(monkeypatch):
+    stopping = asyncio.Event()
+    claims, ran = [], []
+
+    async def claim_job(worker_id):
+        claims.append(worker_id)
+        if len(claims) == 1:
+            raise ConnectionError("mongo unreachable")
+        if len(claims) == 2:
+            return {"_id": "job"}
+        stopping.set()
+
+    async def run_job(job):
+        ran.append(job["_id"])
+
+    monkeypatch.setattr(server, "claim_job", claim_job)
+    monkeypatch.setattr(server, "run_job", run_job)
+
+    asyncio.run(asyncio.wait_for(worker.work("w:0", 0.01, stopping), timeout=5))
+
+    assert len(claims) == 3
+    assert ran == ["job"]